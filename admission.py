@@ -0,0 +1,182 @@
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+from config import get_settings
+from metrics import registry, Counter, Gauge
+import logging
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class ConcurrencyLimiter:
+    """
+    Bounded concurrency with a bounded, deadline-limited wait queue
+
+    Up to ``limit`` holders run at once. Further callers wait in FIFO order,
+    at most ``max_queue`` of them and for at most ``queue_timeout`` seconds;
+    anyone beyond that is turned away immediately. A released slot is
+    handed straight to the oldest waiter.
+
+    With ``adaptive`` set, the limit follows observed latency between
+    ``min_limit`` and ``max_limit`` (AIMD): a request slower than
+    ``target_latency`` cuts it by ``backoff``, at most once per latency
+    window (requests admitted before the last cut do not cut it again),
+    and fast requests that found the limit in use raise it by about one
+    per limit's worth of requests.
+    All methods must be called from the event loop thread.
+    """
+
+    def __init__(
+        self,
+        max_limit: int,
+        max_queue: int,
+        queue_timeout: float,
+        adaptive: bool = False,
+        min_limit: int = 1,
+        target_latency: float = 0.25,
+        backoff: float = 0.9
+    ):
+        self.max_limit = max_limit
+        self.min_limit = min(min_limit, max_limit)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.adaptive = adaptive
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self._decreased_at = float("-inf")
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> Optional[str]:
+        """
+        Take a slot, waiting in the queue if needed
+
+        Returns:
+            None once a slot is held, otherwise why the caller was turned
+            away ("queue_full" or "timeout")
+        """
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return None
+
+        if len(self._waiters) >= self.max_queue:
+            return "queue_full"
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done():
+                # The slot was handed over just as the deadline passed
+                return None
+            self._waiters.remove(waiter)
+            return "timeout"
+        except asyncio.CancelledError:
+            if waiter.done():
+                self.release()
+            else:
+                self._waiters.remove(waiter)
+            raise
+        return None
+
+    def release(self, latency: Optional[float] = None) -> None:
+        """
+        Give back a slot
+
+        Args:
+            latency: Seconds the holder took, used to adapt the limit
+        """
+        if self.adaptive and latency is not None:
+            self._adapt(latency)
+
+        self.in_flight -= 1
+        while self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            self._waiters.popleft().set_result(None)
+
+    def _adapt(self, latency: float) -> None:
+        if latency > self.target_latency:
+            now = time.monotonic()
+            # Requests already running when the limit was cut saw the old
+            # limit's load; only those admitted since may cut it again
+            if now - latency >= self._decreased_at:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._decreased_at = now
+        elif self.in_flight >= int(self.limit):
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """
+    Admission class of a request, or None for requests that are never limited
+
+    Args:
+        method: HTTP method
+        path: Request path
+
+    Returns:
+        "auth", "admin", "export", "read", "write" or None
+    """
+    # CORS preflights are answered before admission; any other OPTIONS is cheap
+    if method == "OPTIONS" or path in ("/health", "/metrics"):
+        return None
+    # Exports hold their slot while streaming, so they get a class of their own
+    if path in ("/todos/export", "/admin/todos/export"):
+        return "export"
+    if path.startswith("/auth/"):
+        return "auth"
+    if path.startswith("/admin/"):
+        return "admin"
+    if method in ("GET", "HEAD"):
+        return "read"
+    return "write"
+
+
+def create_limiters() -> Dict[str, ConcurrencyLimiter]:
+    """Build one limiter per route class from settings"""
+    return {
+        name: ConcurrencyLimiter(
+            max_limit=limit,
+            max_queue=settings.ADMISSION_MAX_QUEUE,
+            queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_MS / 1000,
+            adaptive=settings.ADMISSION_ADAPTIVE,
+            min_limit=settings.ADMISSION_MIN_LIMIT,
+            target_latency=settings.ADMISSION_TARGET_LATENCY_MS / 1000
+        )
+        for name, limit in settings.ADMISSION_LIMITS.items()
+    }
+
+
+limiters = create_limiters()
+
+admission_rejected_total = registry.register(Counter(
+    "admission_rejected_total",
+    "Requests turned away by admission control",
+    ("route_class", "reason")
+))
+registry.register(Gauge(
+    "admission_limit",
+    "Current concurrency limit per route class",
+    ("route_class",),
+    function=lambda: {(name,): int(limiter.limit) for name, limiter in limiters.items()}
+))
+registry.register(Gauge(
+    "admission_in_flight",
+    "Requests holding an admission slot per route class",
+    ("route_class",),
+    function=lambda: {(name,): limiter.in_flight for name, limiter in limiters.items()}
+))
+registry.register(Gauge(
+    "admission_queued",
+    "Requests waiting for an admission slot per route class",
+    ("route_class",),
+    function=lambda: {(name,): limiter.queued for name, limiter in limiters.items()}
+))
@@ -1,16 +1,45 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, Optional, TypeVar
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from config import get_settings
 from schemas import TokenData
 from models import UserRole
+from metrics import registry, Gauge, password_hash_duration_seconds, jwt_duration_seconds
 
 settings = get_settings()
 
 # Password hashing context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+T = TypeVar("T")
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the password hashing pool has no room for more work"""
+
+
+# Dedicated pool for bcrypt work; bcrypt releases the GIL while hashing.
+# A size of 0 disables the pool and hashes inline on the event loop.
+_hash_executor: Optional[ThreadPoolExecutor] = (
+    ThreadPoolExecutor(
+        max_workers=settings.PASSWORD_HASH_WORKERS,
+        thread_name_prefix="password-hash"
+    )
+    if settings.PASSWORD_HASH_WORKERS > 0 else None
+)
+_hash_pending = 0
+
+registry.register(Gauge(
+    "password_hash_pending",
+    "Password hashing calls running or waiting for a worker",
+    function=lambda: {(): _hash_pending}
+))
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against a hashed password"""
@@ -29,6 +58,67 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def _timed(func: Callable[..., T], *args) -> tuple[T, float]:
+    """Call a function and return its result with the elapsed seconds"""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+async def _run_in_hash_pool(operation: str, func: Callable[..., T], *args) -> T:
+    """
+    Run a password hashing function in the hashing pool
+    
+    The bcrypt time is measured in the worker but recorded on the event
+    loop, so the metrics registry is never touched from another thread.
+    
+    Args:
+        operation: Metrics label for the call ("hash" or "verify")
+        func: Function to run
+        *args: Positional arguments for the function
+        
+    Returns:
+        Function result
+        
+    Raises:
+        PasswordHasherBusy: If the pool and its queue are full
+    """
+    global _hash_pending
+    
+    if _hash_executor is None:
+        with password_hash_duration_seconds.time(operation):
+            return func(*args)
+    
+    capacity = settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_MAX_QUEUE
+    if _hash_pending >= capacity:
+        raise PasswordHasherBusy()
+    
+    _hash_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        result, elapsed = await loop.run_in_executor(_hash_executor, _timed, func, *args)
+        password_hash_duration_seconds.observe(elapsed, operation)
+        return result
+    finally:
+        _hash_pending -= 1
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password in the hashing pool without blocking the event loop"""
+    return await _run_in_hash_pool("verify", verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password in the hashing pool without blocking the event loop"""
+    return await _run_in_hash_pool("hash", get_password_hash, password)
+
+
+def shutdown_password_hasher() -> None:
+    """Stop the password hashing pool"""
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False, cancel_futures=True)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
     Create a JWT access token
@@ -52,11 +142,12 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         "type": "access"
     })
     
-    encoded_jwt = jwt.encode(
-        to_encode,
-        settings.SECRET_KEY,
-        algorithm=settings.ALGORITHM
-    )
+    with jwt_duration_seconds.time("encode"):
+        encoded_jwt = jwt.encode(
+            to_encode,
+            settings.SECRET_KEY,
+            algorithm=settings.ALGORITHM
+        )
     
     return encoded_jwt
 
@@ -79,11 +170,12 @@ def create_refresh_token(data: dict) -> str:
         "type": "refresh"
     })
     
-    encoded_jwt = jwt.encode(
-        to_encode,
-        settings.SECRET_KEY,
-        algorithm=settings.ALGORITHM
-    )
+    with jwt_duration_seconds.time("encode"):
+        encoded_jwt = jwt.encode(
+            to_encode,
+            settings.SECRET_KEY,
+            algorithm=settings.ALGORITHM
+        )
     
     return encoded_jwt
 
@@ -100,11 +192,12 @@ def verify_token(token: str, token_type: str = "access") -> Optional[TokenData]:
         TokenData object if valid, None otherwise
     """
     try:
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM]
-        )
+        with jwt_duration_seconds.time("decode"):
+            payload = jwt.decode(
+                token,
+                settings.SECRET_KEY,
+                algorithms=[settings.ALGORITHM]
+            )
         
         # Verify token type
         if payload.get("type") != token_type:
@@ -127,6 +220,32 @@ def verify_token(token: str, token_type: str = "access") -> Optional[TokenData]:
         return None
 
 
+# Access token already verified in the current request, so the rate limiter
+# and the authentication dependency decode it only once
+_verified_access_token: ContextVar[Optional[tuple]] = ContextVar(
+    "verified_access_token", default=None
+)
+
+
+def verify_access_token(token: str) -> Optional[TokenData]:
+    """
+    Verify an access token, reusing the result from earlier in the request
+    
+    Args:
+        token: JWT access token string
+        
+    Returns:
+        TokenData object if valid, None otherwise
+    """
+    verified = _verified_access_token.get()
+    if verified is not None and verified[0] == token:
+        return verified[1]
+    
+    token_data = verify_token(token, token_type="access")
+    _verified_access_token.set((token, token_data))
+    return token_data
+
+
 def create_email_verification_token(email: str) -> str:
     """
     Create a token for email verification (mock implementation)
@@ -144,11 +263,12 @@ def create_email_verification_token(email: str) -> str:
         "type": "email_verification"
     }
     
-    encoded_jwt = jwt.encode(
-        to_encode,
-        settings.SECRET_KEY,
-        algorithm=settings.ALGORITHM
-    )
+    with jwt_duration_seconds.time("encode"):
+        encoded_jwt = jwt.encode(
+            to_encode,
+            settings.SECRET_KEY,
+            algorithm=settings.ALGORITHM
+        )
     
     return encoded_jwt
 
@@ -164,11 +284,12 @@ def verify_email_token(token: str) -> Optional[str]:
         Email address if valid, None otherwise
     """
     try:
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM]
-        )
+        with jwt_duration_seconds.time("decode"):
+            payload = jwt.decode(
+                token,
+                settings.SECRET_KEY,
+                algorithms=[settings.ALGORITHM]
+            )
         
         if payload.get("type") != "email_verification":
             return None
@@ -0,0 +1,105 @@
+"""
+Helpers shared by the benchmark scripts
+
+Scripts import this module before pointing DATABASE_URL at their scratch
+database, so nothing here imports the application at module level.
+"""
+import atexit
+import random
+import tempfile
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+# Seeded data spans the year before SEED_END, so runs are reproducible
+SEED_END = datetime(2026, 1, 1)
+SEED_DAYS = 365
+# Seeded users are only ever acted as through minted tokens, never logged in
+SEED_PASSWORD_HASH = "x"
+SEED_BATCH_SIZE = 10_000
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def temp_dir() -> str:
+    """Create a scratch directory that is removed when the process exits"""
+    directory = tempfile.TemporaryDirectory(prefix="todo-bench-")
+    atexit.register(directory.cleanup)
+    return directory.name
+
+
+async def seed_todos(
+    rows: int,
+    users: int,
+    seed: int = 0,
+    completion_rate: float = 0.6,
+    customize: Optional[Callable[[random.Random, dict], None]] = None
+) -> list[dict]:
+    """
+    Insert active users owning rows todos between them
+
+    Rows are built with seed_data's builders, so benchmarks see the same
+    shape of data as a seeded database, and inserted in batches with each
+    user's todo counter. Todos are spread evenly over the users, who are
+    numbered after any existing ones (such as the default admin).
+
+    Args:
+        rows: Todos to insert
+        users: Users to create and spread the todos over
+        seed: Random seed
+        completion_rate: Fraction of todos completed
+        customize: Called with the generator and each todo row before it is
+            inserted, to override fields
+
+    Returns:
+        The inserted users rows
+    """
+    # Imported here, once the calling script has set DATABASE_URL
+    from sqlalchemy import func, select
+
+    from database import engine
+    from models import Todo, TodoCounter, User
+    from seed_data import insert_rows, make_counter, make_todo, make_user
+
+    async with engine.connect() as conn:
+        first_id = (await conn.execute(select(func.coalesce(func.max(User.id), 0)))).scalar_one() + 1
+
+    rng = random.Random(seed)
+    start = SEED_END - timedelta(days=SEED_DAYS)
+    span = (SEED_END - start).total_seconds()
+
+    user_rows = [
+        make_user(rng, user_id, SEED_PASSWORD_HASH, start, span)
+        for user_id in range(first_id, first_id + users)
+    ]
+    for user in user_rows:
+        user["is_active"] = True
+    await insert_rows(User.__table__, user_rows)
+
+    counters = []
+    for index, user in enumerate(user_rows):
+        count = rows // users + (index < rows % users)
+        counter = make_counter(user["id"], [])
+        for batch_start in range(0, count, SEED_BATCH_SIZE):
+            todos = [
+                make_todo(rng, user["id"], user["created_at"], SEED_END, completion_rate)
+                for _ in range(min(SEED_BATCH_SIZE, count - batch_start))
+            ]
+            if customize is not None:
+                for todo in todos:
+                    customize(rng, todo)
+            await insert_rows(Todo.__table__, todos)
+
+            for key, value in make_counter(user["id"], todos).items():
+                if key != "user_id":
+                    counter[key] += value
+        counters.append(counter)
+
+    await insert_rows(TodoCounter.__table__, counters)
+    return user_rows
@@ -0,0 +1,110 @@
+"""
+Microbenchmarks for the per-request auth and validation building blocks
+
+Times each primitive in isolation with pyperf, which calibrates the loop
+count, runs in several worker processes and reports mean +- std dev:
+JWT creation and verification (python-jose), bcrypt verification, and
+validating TodoCreate request bodies and TodoResponse / UserResponse
+from ORM objects.
+
+Save a run per commit and compare them to spot regressions:
+
+Usage:
+    python benchmarks/auth_primitives.py -o before.json
+    python benchmarks/auth_primitives.py -o after.json
+    python -m pyperf compare_to before.json after.json --table
+    python benchmarks/auth_primitives.py --fast jwt_verify_token todo_create_json
+
+Reference run (--fast, pyperf 2.6.2, Python 3.11.7, one x86_64 CPU; only
+comparable with runs on the same machine):
+
+    jwt_create_access_token   26.6 us +- 4.3 us
+    jwt_verify_token          49.8 us +- 8.4 us
+    bcrypt_verify              298 ms +- 15 ms
+    todo_create_dict          2.82 us +- 0.45 us
+    todo_create_json          4.31 us +- 1.05 us
+    todo_response_from_orm    6.37 us +- 0.55 us
+    user_response_from_orm    50.1 us +- 6.1 us
+"""
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("DEBUG", "false")
+
+import json  # noqa: E402
+
+import pyperf  # noqa: E402
+
+from auth import create_access_token, verify_password, verify_token  # noqa: E402
+from models import Todo, TodoPriority, User, UserRole  # noqa: E402
+from schemas import TodoCreate, TodoResponse, UserResponse  # noqa: E402
+
+PASSWORD = "bench-password"
+# bcrypt hash of PASSWORD, so each pyperf worker does not spend a hash on setup
+PASSWORD_HASH = "$2b$12$cUfQfWBw.TGoZOeJlYPEQuMQV3B19wTzWzsz4COghJPoMBCVqvlrq"
+CLAIMS = {"sub": "bench_user", "user_id": 42, "role": UserRole.USER.value}
+TODO_BODY = {
+    "title": "Review the quarterly budget ✓",
+    "description": "Check the totals against last quarter before Friday's meeting",
+    "priority": "high",
+}
+
+
+def build_benchmarks() -> dict:
+    """Benchmark name -> (function, args)"""
+    token = create_access_token(CLAIMS)
+    now = datetime(2026, 1, 1, 12, 0, 0)
+
+    todo = Todo(
+        id=1, title=TODO_BODY["title"], description=TODO_BODY["description"],
+        priority=TodoPriority.HIGH, is_completed=True, owner_id=42,
+        created_at=now, updated_at=now, completed_at=now
+    )
+    user = User(
+        id=42, email="bench@example.com", username="bench_user", full_name="Bench User",
+        hashed_password=PASSWORD_HASH, role=UserRole.USER, is_active=True,
+        is_verified=True, created_at=now
+    )
+
+    return {
+        "jwt_create_access_token": (create_access_token, (CLAIMS,)),
+        "jwt_verify_token": (verify_token, (token,)),
+        "bcrypt_verify": (verify_password, (PASSWORD, PASSWORD_HASH)),
+        "todo_create_dict": (TodoCreate.model_validate, (TODO_BODY,)),
+        "todo_create_json": (TodoCreate.model_validate_json, (json.dumps(TODO_BODY),)),
+        "todo_response_from_orm": (TodoResponse.model_validate, (todo,)),
+        "user_response_from_orm": (UserResponse.model_validate, (user,)),
+    }
+
+
+def add_cmdline_args(cmd: list, args) -> None:
+    """Pass the benchmark selection on to pyperf's worker processes"""
+    cmd.extend(args.benchmarks)
+
+
+def main() -> None:
+    runner = pyperf.Runner(add_cmdline_args=add_cmdline_args)
+    runner.metadata["description"] = __doc__.splitlines()[1]
+    runner.argparser.add_argument(
+        "benchmarks", nargs="*", help="Benchmarks to run (default: all)"
+    )
+    args = runner.parse_args()
+
+    benchmarks = build_benchmarks()
+    unknown = set(args.benchmarks) - set(benchmarks)
+    if unknown:
+        runner.argparser.error(
+            f"unknown benchmarks: {', '.join(sorted(unknown))}; "
+            f"choose from {', '.join(benchmarks)}"
+        )
+
+    for name, (func, func_args) in benchmarks.items():
+        if not args.benchmarks or name in args.benchmarks:
+            runner.bench_func(name, func, *func_args)
+
+
+if __name__ == "__main__":
+    main()
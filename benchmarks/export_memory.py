@@ -0,0 +1,117 @@
+"""
+Check that streaming exports keep memory flat regardless of row count
+
+Seeds a throwaway SQLite database with one user owning --rows todos, built
+like seed_data.py's, then drives GET /todos/export through the ASGI app
+directly (discarding body chunks as they arrive) while sampling the
+process RSS. Exits with status 1 if RSS grows by more than
+--max-growth-mb during the export.
+
+Usage:
+    python benchmarks/export_memory.py --rows 2000000 --format csv
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from _common import seed_todos, temp_dir  # noqa: E402
+
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{temp_dir()}/export.db"
+os.environ.setdefault("DEBUG", "false")
+
+import logging  # noqa: E402
+
+from auth import create_access_token  # noqa: E402
+from main import app  # noqa: E402
+
+logging.disable(logging.INFO)
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process in MiB"""
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * PAGE_SIZE / 2**20
+
+
+async def export(user: dict, export_format: str) -> dict:
+    """Run one export through the ASGI app, sampling RSS per chunk"""
+    token = create_access_token({"sub": user["username"], "user_id": user["id"], "role": "user"})
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/todos/export",
+        "raw_path": b"/todos/export",
+        "query_string": f"format={export_format}".encode(),
+        "headers": [(b"authorization", f"Bearer {token}".encode()), (b"host", b"bench")],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    stats = {"status": None, "bytes": 0, "lines": 0, "peak_rss_mb": rss_mb()}
+    request_sent = False
+    response_done = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            stats["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            body = message.get("body", b"")
+            stats["bytes"] += len(body)
+            stats["lines"] += body.count(b"\n")
+            stats["peak_rss_mb"] = max(stats["peak_rss_mb"], rss_mb())
+            if not message.get("more_body", False):
+                response_done.set()
+
+    await app(scope, receive, send)
+    return stats
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=2_000_000, help="Todos to seed")
+    parser.add_argument("--format", choices=("ndjson", "csv"), default="ndjson")
+    parser.add_argument("--max-growth-mb", type=float, default=64.0, help="Allowed RSS growth")
+    args = parser.parse_args()
+
+    async with app.router.lifespan_context(app):
+        start = time.perf_counter()
+        [user] = await seed_todos(args.rows, users=1)
+        print(f"seeded {args.rows} rows in {time.perf_counter() - start:.1f}s")
+
+        baseline = rss_mb()
+        start = time.perf_counter()
+        stats = await export(user, args.format)
+        elapsed = time.perf_counter() - start
+
+    growth = stats["peak_rss_mb"] - baseline
+    print(
+        f"status={stats['status']} lines={stats['lines']} "
+        f"bytes={stats['bytes'] / 2**20:.1f}MiB time={elapsed:.1f}s "
+        f"rows/s={args.rows / elapsed:,.0f}"
+    )
+    print(
+        f"rss baseline={baseline:.1f}MiB peak={stats['peak_rss_mb']:.1f}MiB "
+        f"growth={growth:.1f}MiB (limit {args.max_growth_mb:.0f}MiB)"
+    )
+
+    return 0 if stats["status"] == 200 and growth <= args.max_growth_mb else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,147 @@
+"""
+Measure the cost of building one page of GET /todos/ and GET /admin/todos
+
+Seeds a throwaway SQLite database with --rows todos over a few owners,
+built like seed_data.py's, then times building a --limit sized page both
+ways: loading ORM objects and letting FastAPI validate, convert and
+json-encode them (serialize_response plus JSONResponse, as the endpoints
+did before), and selecting only the response columns and encoding them
+with the list TypeAdapter (json_list_response). Reports the mean time per page split into query and
+serialization, and checks that both produce the same bytes.
+
+Usage:
+    python benchmarks/list_serialization.py --rows 2000 --limit 100 --pages 500
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from _common import seed_todos, temp_dir  # noqa: E402
+
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{temp_dir()}/serialization.db"
+os.environ["DEBUG"] = "false"
+
+import logging  # noqa: E402
+from typing import List  # noqa: E402
+
+from fastapi import Response  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+from sqlalchemy.orm import selectinload  # noqa: E402
+
+from database import AsyncSessionLocal, engine, init_db  # noqa: E402
+from models import Todo  # noqa: E402
+from pagination import apply_pagination  # noqa: E402
+from schemas import TodoResponse, TodoWithOwner  # noqa: E402
+from serialization import (  # noqa: E402
+    json_list_response, row_dicts, todo_list_adapter, todo_list_query,
+    todo_with_owner_list_adapter, todo_with_owner_list_query, with_owner
+)
+
+logging.disable(logging.INFO)
+
+USERS = 4
+
+
+def quoted_title(rng, todo: dict) -> None:
+    """Give titles characters that JSON encoders escape"""
+    todo["title"] += ' – "quoted" ✓'
+
+
+async def orm_page(query, field, with_owner_loaded: bool) -> tuple[float, float, bytes]:
+    """Previous path: ORM objects through FastAPI's response serialization"""
+    if with_owner_loaded:
+        query = query.options(selectinload(Todo.owner))
+    async with AsyncSessionLocal() as db:
+        start = time.perf_counter()
+        todos = (await db.execute(query)).scalars().all()
+        loaded = time.perf_counter()
+        content = await serialize_response(field=field, response_content=todos)
+        body = JSONResponse(content).body
+        done = time.perf_counter()
+    return loaded - start, done - loaded, body
+
+
+async def row_page(query, adapter, nest_owner: bool) -> tuple[float, float, bytes]:
+    """Current path: response columns through the list TypeAdapter"""
+    async with AsyncSessionLocal() as db:
+        start = time.perf_counter()
+        rows = (await db.execute(query)).all()
+        loaded = time.perf_counter()
+        items = with_owner(rows) if nest_owner else row_dicts(rows)
+        body = json_list_response(adapter, items, Response()).body
+        done = time.perf_counter()
+    return loaded - start, done - loaded, body
+
+
+async def measure(name: str, page, pages: int) -> tuple[bytes, float]:
+    """Print mean query and serialization time per page; returns the body and total"""
+    # Warm up before timing
+    for _ in range(20):
+        await page()
+
+    query_times, serialize_times = [], []
+    for _ in range(pages):
+        query_seconds, serialize_seconds, body = await page()
+        query_times.append(query_seconds)
+        serialize_times.append(serialize_seconds)
+
+    query_mean = statistics.mean(query_times)
+    serialize_mean = statistics.mean(serialize_times)
+    print(
+        f"{name:<28}query {query_mean * 1e3:>7.3f} ms   serialize {serialize_mean * 1e3:>7.3f} ms"
+        f"   total {(query_mean + serialize_mean) * 1e3:>7.3f} ms/page   ({len(body)} bytes)"
+    )
+    return body, query_mean + serialize_mean
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=2000, help="Todos to seed")
+    parser.add_argument("--limit", type=int, default=100, help="Todos per page")
+    parser.add_argument("--pages", type=int, default=500, help="Pages to build per path")
+    args = parser.parse_args()
+
+    await init_db()
+    users = await seed_todos(args.rows, USERS, customize=quoted_title)
+
+    todo_field = create_response_field("Response_get_todos", List[TodoResponse])
+    owner_field = create_response_field("Response_get_all_todos", List[TodoWithOwner])
+    owned = Todo.owner_id == users[0]["id"]
+
+    cases = {
+        "GET /todos/": (
+            lambda: orm_page(apply_pagination(select(Todo).where(owned), None, 0, args.limit), todo_field, False),
+            lambda: row_page(apply_pagination(todo_list_query().where(owned), None, 0, args.limit), todo_list_adapter, False),
+        ),
+        "GET /admin/todos": (
+            lambda: orm_page(apply_pagination(select(Todo), None, 0, args.limit), owner_field, True),
+            lambda: row_page(
+                apply_pagination(todo_with_owner_list_query(), None, 0, args.limit),
+                todo_with_owner_list_adapter, True
+            ),
+        ),
+    }
+
+    identical = True
+    for endpoint, (orm, rows) in cases.items():
+        print(endpoint)
+        orm_body, orm_total = await measure("  ORM + serialize_response", orm, args.pages)
+        row_body, row_total = await measure("  columns + TypeAdapter", rows, args.pages)
+        same = orm_body == row_body
+        identical = identical and same
+        print(f"  speedup {orm_total / row_total:.2f}x   identical bytes={same}")
+
+    await engine.dispose()
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
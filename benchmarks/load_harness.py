@@ -0,0 +1,461 @@
+"""
+End-to-end load test with per-route latency and a regression check
+
+Drives the real application, either in-process through httpx's ASGI
+transport or as a locally spawned uvicorn server, against a throwaway
+SQLite database. --concurrency closed-loop clients, spread over --users
+accounts, each pick operations at random from a weighted mix (list,
+create, toggle, stats, login, admin overview). After --warmup seconds
+nothing is recorded, every request is timed for --duration seconds.
+
+Reports throughput, failures (unexpected statuses), errors (no response,
+e.g. refused or timed out connections) and p50/p95/p99 latency per
+route. With a baseline JSON (written by --save-baseline) the run fails
+with exit status 1 when a route's p50/p95/p99 grew, or its throughput
+fell, by more than --tolerance and at least --min-delta-ms, or when it
+had more failures or errors than --tolerance allows.
+
+Baselines are only comparable on the same machine with the same options.
+The committed load_baseline.json was recorded on a single development
+machine (see its "machine" entry) and is a reference, not a threshold
+for other hardware: record your own with --save-baseline, e.g. to a file
+outside the repository passed with --baseline, and compare against that.
+
+Usage:
+    python benchmarks/load_harness.py --concurrency 32 --duration 20 --save-baseline
+    python benchmarks/load_harness.py --concurrency 32 --duration 20
+    python benchmarks/load_harness.py --mix list=80,create=20 --transport uvicorn
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from _common import percentile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "load_baseline.json")
+
+# Operation -> default weight
+DEFAULT_MIX = {
+    "list": 50,
+    "create": 15,
+    "toggle": 15,
+    "stats": 10,
+    "login": 5,
+    "admin_overview": 5,
+}
+
+PASSWORD = "bench-password"
+ADMIN = {"username": "admin", "password": "admin123"}
+PERCENTILES = (50, 95, 99)
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    """Parse "list=50,create=20" into operation weights"""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(
+                f"unknown operation {name!r}, expected one of {', '.join(DEFAULT_MIX)}"
+            )
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid weight for {name!r}: {weight!r}")
+    return mix
+
+
+class Recorder:
+    """Latencies, failures and errors per route, recorded only while enabled"""
+
+    def __init__(self):
+        self.recording = False
+        self.latencies: dict[str, list[float]] = {}
+        self.failures: dict[str, int] = {}
+        self.statuses: dict[str, dict[int, int]] = {}
+        self.errors: dict[str, dict[str, int]] = {}
+
+    def _route(self, route: str) -> None:
+        self.latencies.setdefault(route, [])
+        self.failures.setdefault(route, 0)
+        self.errors.setdefault(route, {})
+
+    def record(self, route: str, status: int, expected: int, seconds: float) -> None:
+        if not self.recording:
+            return
+        self._route(route)
+        if status == expected:
+            self.latencies[route].append(seconds)
+        else:
+            self.failures[route] += 1
+            counts = self.statuses.setdefault(route, {})
+            counts[status] = counts.get(status, 0) + 1
+
+    def error(self, route: str, error: Exception) -> None:
+        if not self.recording:
+            return
+        self._route(route)
+        counts = self.errors[route]
+        name = type(error).__name__
+        counts[name] = counts.get(name, 0) + 1
+
+    def summary(self, duration: float) -> dict:
+        routes = {}
+        for route in sorted(self.latencies):
+            latencies = self.latencies[route]
+            routes[route] = {
+                "ok": len(latencies),
+                "failed": self.failures[route],
+                "errors": sum(self.errors[route].values()),
+                "per_second": len(latencies) / duration,
+                **{f"p{pct}_ms": percentile(latencies, pct) * 1000 for pct in PERCENTILES},
+            }
+            if route in self.statuses:
+                routes[route]["failed_statuses"] = {
+                    str(status): count for status, count in sorted(self.statuses[route].items())
+                }
+            if self.errors[route]:
+                routes[route]["error_types"] = dict(sorted(self.errors[route].items()))
+
+        everything = [latency for latencies in self.latencies.values() for latency in latencies]
+        routes["total"] = {
+            "ok": len(everything),
+            "failed": sum(self.failures.values()),
+            "errors": sum(sum(counts.values()) for counts in self.errors.values()),
+            "per_second": len(everything) / duration,
+            **{f"p{pct}_ms": percentile(everything, pct) * 1000 for pct in PERCENTILES},
+        }
+        return routes
+
+
+class Client:
+    """One simulated user session"""
+
+    def __init__(self, http, recorder: Recorder, username: str, headers: dict,
+                 admin_headers: dict, todo_ids: list[int], rng: random.Random):
+        self.http = http
+        self.recorder = recorder
+        self.username = username
+        self.headers = headers
+        self.admin_headers = admin_headers
+        self.todo_ids = todo_ids
+        self.rng = rng
+        self.created = 0
+
+    async def request(self, route: str, expected: int, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await self.http.request(method, url, **kwargs)
+        except Exception as e:
+            # No response at all (refused, reset, timed out): count it and go on
+            self.recorder.error(route, e)
+            return None
+        self.recorder.record(route, response.status_code, expected, time.perf_counter() - start)
+        return response
+
+    async def list(self) -> None:
+        await self.request("GET /todos/", 200, "GET", "/todos/?limit=20", headers=self.headers)
+
+    async def create(self) -> None:
+        self.created += 1
+        response = await self.request(
+            "POST /todos/", 201, "POST", "/todos/", headers=self.headers, json={
+                "title": f"Load test todo {self.created}",
+                "description": "Created by the load harness",
+                "priority": self.rng.choice(("low", "medium", "high")),
+            }
+        )
+        if response is not None and response.status_code == 201:
+            self.todo_ids.append(response.json()["id"])
+
+    async def toggle(self) -> None:
+        if not self.todo_ids:
+            return await self.create()
+        todo_id = self.rng.choice(self.todo_ids)
+        await self.request(
+            "PATCH /todos/{id}/complete", 200, "PATCH", f"/todos/{todo_id}/complete",
+            headers=self.headers
+        )
+
+    async def stats(self) -> None:
+        await self.request(
+            "GET /todos/stats/summary", 200, "GET", "/todos/stats/summary", headers=self.headers
+        )
+
+    async def login(self) -> None:
+        await self.request(
+            "POST /auth/login", 200, "POST", "/auth/login",
+            data={"username": self.username, "password": PASSWORD}
+        )
+
+    async def admin_overview(self) -> None:
+        await self.request(
+            "GET /admin/stats/overview", 200, "GET", "/admin/stats/overview",
+            headers=self.admin_headers
+        )
+
+
+async def login(http, username: str, password: str) -> dict:
+    response = await http.post("/auth/login", data={"username": username, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def setup(http, users: int, todos_per_user: int) -> tuple[list, dict]:
+    """Register the load test users, seed their todos and log everyone in"""
+    admin_headers = await login(http, ADMIN["username"], ADMIN["password"])
+
+    async def prepare(n: int):
+        username = f"load_user{n}"
+        await http.post("/auth/register", json={
+            "email": f"load{n}@example.com", "username": username, "password": PASSWORD
+        })
+        headers = await login(http, username, PASSWORD)
+        response = await http.post("/todos/batch", headers=headers, json={
+            "items": [{"title": f"Seed todo {i}"} for i in range(todos_per_user)]
+        })
+        response.raise_for_status()
+        todo_ids = [result["todo"]["id"] for result in response.json()["results"]]
+        return username, headers, todo_ids
+
+    return await asyncio.gather(*(prepare(n) for n in range(users))), admin_headers
+
+
+async def drive(http, args) -> dict:
+    """Run the warm-up and measured phases against a ready application"""
+    accounts, admin_headers = await setup(http, args.users, args.todos_per_user)
+    recorder = Recorder()
+    operations = list(args.mix)
+    weights = [args.mix[name] for name in operations]
+
+    clients = []
+    for n in range(args.concurrency):
+        username, headers, todo_ids = accounts[n % len(accounts)]
+        clients.append(Client(
+            http, recorder, username, headers, admin_headers, todo_ids,
+            random.Random(args.seed * 1_000_003 + n)
+        ))
+
+    async def loop(client: Client, stop_at: float) -> None:
+        while time.perf_counter() < stop_at:
+            operation = client.rng.choices(operations, weights)[0]
+            await getattr(client, operation)()
+
+    stop_at = time.perf_counter() + args.warmup + args.duration
+
+    async def start_recording() -> None:
+        await asyncio.sleep(args.warmup)
+        recorder.recording = True
+
+    await asyncio.gather(start_recording(), *(loop(client, stop_at) for client in clients))
+    return recorder.summary(args.duration)
+
+
+async def run_in_process(args, env: dict) -> dict:
+    os.environ.update(env)
+    sys.path.insert(0, ROOT)
+
+    import logging
+
+    import httpx
+
+    from main import app
+
+    logging.disable(logging.WARNING)
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as http:
+            return await drive(http, args)
+
+
+async def run_uvicorn(args, env: dict) -> dict:
+    import httpx
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT, env={**os.environ, **env}
+    )
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", timeout=60, limits=limits
+        ) as http:
+            for _ in range(300):
+                try:
+                    if (await http.get("/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if server.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with status {server.returncode}")
+                await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError("uvicorn did not become healthy")
+
+            return await drive(http, args)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def compare(current: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> list[str]:
+    """Describe every route that regressed against the baseline"""
+    regressions = []
+    for route, before in baseline["routes"].items():
+        after = current.get(route)
+        if after is None:
+            regressions.append(f"{route}: not exercised in this run")
+            continue
+
+        for pct in PERCENTILES:
+            key = f"p{pct}_ms"
+            limit = max(before[key] * (1 + tolerance), before[key] + min_delta_ms)
+            if after[key] > limit:
+                regressions.append(
+                    f"{route}: p{pct} {before[key]:.2f} -> {after[key]:.2f} ms"
+                )
+
+        if after["per_second"] < before["per_second"] * (1 - tolerance):
+            regressions.append(
+                f"{route}: throughput {before['per_second']:.1f} -> {after['per_second']:.1f}/s"
+            )
+
+        # A clean baseline makes any failure or error a regression
+        for key in ("failed", "errors"):
+            if after.get(key, 0) > before.get(key, 0) * (1 + tolerance):
+                regressions.append(f"{route}: {key} {before.get(key, 0)} -> {after[key]}")
+    return regressions
+
+
+def machine_info() -> dict:
+    """Describe the machine a run was recorded on"""
+    return {
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+    }
+
+
+def print_report(routes: dict, baseline: dict | None) -> None:
+    header = f"{'route':<30}{'ok':>8}{'failed':>8}{'errors':>8}{'req/s':>10}" + "".join(
+        f"{f'p{pct} ms':>10}" for pct in PERCENTILES
+    )
+    print(header)
+    print("-" * len(header))
+    for route, result in routes.items():
+        line = (
+            f"{route:<30}{result['ok']:>8}{result['failed']:>8}{result.get('errors', 0):>8}"
+            f"{result['per_second']:>10.1f}"
+        )
+        line += "".join(f"{result[f'p{pct}_ms']:>10.2f}" for pct in PERCENTILES)
+        before = baseline["routes"].get(route) if baseline else None
+        if before and before["p95_ms"]:
+            line += f"   p95 {(result['p95_ms'] / before['p95_ms'] - 1) * 100:+.0f}% vs baseline"
+        print(line)
+        if result.get("failed_statuses"):
+            print(f"{'':<30}failed statuses: {result['failed_statuses']}")
+        if result.get("error_types"):
+            print(f"{'':<30}errors: {result['error_types']}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--transport", choices=("asgi", "uvicorn"), default="asgi",
+                        help="Call the app in-process or through a spawned uvicorn server")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--users", type=int, default=8, help="Accounts the clients are spread over")
+    parser.add_argument("--todos-per-user", type=int, default=50, help="Todos seeded per account")
+    parser.add_argument("--duration", type=float, default=15.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unrecorded seconds before measuring")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="Operation weights, e.g. list=50,create=15,toggle=15,stats=10,login=5,admin_overview=5")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for the operation choices")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative growth in latency / drop in throughput")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0,
+                        help="Latency growth always tolerated, however large relatively")
+    parser.add_argument("--output", help="Also write this run's results as JSON here")
+    args = parser.parse_args()
+
+    runner = run_in_process if args.transport == "asgi" else run_uvicorn
+    with tempfile.TemporaryDirectory(prefix="todo-bench-") as db_dir:
+        env = {
+            "DATABASE_URL": f"sqlite+aiosqlite:///{db_dir}/load.db",
+            "DEBUG": "false",
+            # Every simulated client shares one address, and logs in repeatedly
+            "RATE_LIMIT_ENABLED": "false",
+        }
+        routes = asyncio.run(runner(args, env))
+
+    options = {
+        "transport": args.transport,
+        "concurrency": args.concurrency,
+        "users": args.users,
+        "todos_per_user": args.todos_per_user,
+        "duration": args.duration,
+        "mix": args.mix,
+    }
+    result = {"options": options, "machine": machine_info(), "routes": routes}
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print_report(routes, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(result, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if baseline is None:
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+
+    if baseline["options"] != options:
+        print(f"\nWarning: baseline was recorded with different options: {baseline['options']}")
+    if baseline.get("machine") != result["machine"]:
+        print(
+            f"\nWarning: baseline was recorded on another machine: {baseline.get('machine')}; "
+            "latency and throughput are not comparable, record a local baseline with --save-baseline"
+        )
+
+    regressions = compare(routes, baseline, args.tolerance, args.min_delta_ms)
+    if regressions:
+        print(f"\nRegressions beyond {args.tolerance:.0%} (and {args.min_delta_ms} ms):")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+
+    print("\nNo regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
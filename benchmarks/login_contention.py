@@ -0,0 +1,128 @@
+"""
+Measure GET /todos/ latency while /auth/login is under load
+
+Runs the real application in-process through httpx's ASGI transport against
+a throwaway SQLite database, first with no login traffic and then with a
+number of concurrent clients hammering /auth/login.
+
+Usage:
+    python benchmarks/login_contention.py --login-clients 8 --duration 10
+    PASSWORD_HASH_WORKERS=0 python benchmarks/login_contention.py  # inline bcrypt
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from _common import percentile, temp_dir  # noqa: E402
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{temp_dir()}/bench.db"
+os.environ.setdefault("DEBUG", "false")
+# The benchmark logs in far more often than the login rate limit allows
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import logging  # noqa: E402
+
+import httpx  # noqa: E402
+
+from main import app  # noqa: E402
+
+logging.disable(logging.INFO)
+
+USERNAME = "bench_user"
+PASSWORD = "bench-password"
+
+
+async def setup(client: httpx.AsyncClient) -> dict:
+    """Register the benchmark user, seed a page of todos and return auth headers"""
+    await client.post("/auth/register", json={
+        "email": "bench@example.com",
+        "username": USERNAME,
+        "password": PASSWORD
+    })
+    response = await client.post(
+        "/auth/login", data={"username": USERNAME, "password": PASSWORD}
+    )
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    for i in range(20):
+        await client.post("/todos/", json={"title": f"todo {i}"}, headers=headers)
+
+    return headers
+
+
+async def list_reader(client, headers, stop_at: float, latencies: list[float]):
+    """Fetch /todos/ in a loop, recording latency"""
+    while time.perf_counter() < stop_at:
+        start = time.perf_counter()
+        response = await client.get("/todos/", headers=headers)
+        latencies.append(time.perf_counter() - start)
+        response.raise_for_status()
+
+
+async def login_client(client, stop_at: float, statuses: dict):
+    """Log in repeatedly, counting response status codes"""
+    while time.perf_counter() < stop_at:
+        response = await client.post(
+            "/auth/login", data={"username": USERNAME, "password": PASSWORD}
+        )
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        if response.status_code == 503:
+            await asyncio.sleep(0.05)
+
+
+async def run_phase(client, headers, readers: int, login_clients: int, duration: float):
+    """Run one measurement phase and return its results"""
+    latencies: list[float] = []
+    statuses: dict[int, int] = {}
+    stop_at = time.perf_counter() + duration
+
+    await asyncio.gather(
+        *(list_reader(client, headers, stop_at, latencies) for _ in range(readers)),
+        *(login_client(client, stop_at, statuses) for _ in range(login_clients))
+    )
+
+    return {
+        "requests": len(latencies),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "logins": statuses
+    }
+
+
+def report(name: str, result: dict) -> None:
+    print(
+        f"{name:<18} /todos/ n={result['requests']:<6} "
+        f"p50={result['p50_ms']:.1f}ms p99={result['p99_ms']:.1f}ms "
+        f"mean={result['mean_ms']:.1f}ms logins={result['logins']}"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--readers", type=int, default=4, help="Concurrent /todos/ clients")
+    parser.add_argument("--login-clients", type=int, default=8, help="Concurrent /auth/login clients")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per phase")
+    args = parser.parse_args()
+
+    print(f"PASSWORD_HASH_WORKERS={os.environ.get('PASSWORD_HASH_WORKERS', 'default')}")
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            headers = await setup(client)
+            report("idle", await run_phase(client, headers, args.readers, 0, args.duration))
+            report(
+                "login load",
+                await run_phase(client, headers, args.readers, args.login_clients, args.duration)
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,152 @@
+"""
+Measure per-request overhead of the logging and security header middleware
+
+Calls a trivial Starlette endpoint directly through ASGI (no network, no
+HTTP client) with no middleware, with the previous BaseHTTPMiddleware
+implementations, and with the current pure ASGI ones, and reports the mean
+time per request for each stack.
+
+Usage:
+    python benchmarks/middleware_overhead.py --requests 20000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.applications import Starlette  # noqa: E402
+from starlette.middleware import Middleware  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+from starlette.responses import PlainTextResponse  # noqa: E402
+from starlette.routing import Route  # noqa: E402
+
+from middleware import LoggingMiddleware, SecurityHeadersMiddleware  # noqa: E402
+
+logging.disable(logging.INFO)
+
+
+class BaseHTTPLoggingMiddleware(BaseHTTPMiddleware):
+    """Previous LoggingMiddleware, kept here as the baseline"""
+
+    async def dispatch(self, request, call_next):
+        start_time = time.time()
+        logging.getLogger("middleware").info(
+            f"Request: {request.method} {request.url.path} "
+            f"- Client: {request.client.host if request.client else 'unknown'}"
+        )
+        response = await call_next(request)
+        process_time = time.time() - start_time
+        logging.getLogger("middleware").info(
+            f"Response: {request.method} {request.url.path} "
+            f"- Status: {response.status_code} - Time: {process_time:.3f}s"
+        )
+        response.headers["X-Process-Time"] = str(process_time)
+        return response
+
+
+class BaseHTTPSecurityHeadersMiddleware(BaseHTTPMiddleware):
+    """Previous SecurityHeadersMiddleware, kept here as the baseline"""
+
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        response.headers.update(SecurityHeadersMiddleware.HEADERS)
+        return response
+
+
+async def ping(request):
+    return PlainTextResponse("pong")
+
+
+def build_app(middleware: list[Middleware]) -> Starlette:
+    return Starlette(routes=[Route("/ping", ping)], middleware=middleware)
+
+
+STACKS = {
+    "none": [],
+    "BaseHTTPMiddleware": [
+        Middleware(BaseHTTPLoggingMiddleware),
+        Middleware(BaseHTTPSecurityHeadersMiddleware),
+    ],
+    "pure ASGI": [
+        Middleware(LoggingMiddleware),
+        Middleware(SecurityHeadersMiddleware),
+    ],
+}
+
+
+async def run(app: Starlette, requests: int) -> tuple[float, dict]:
+    """Mean seconds per request for a GET /ping, and the response headers"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/ping",
+        "raw_path": b"/ping",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    headers = {}
+
+    async def request():
+        """Send one request; receive blocks like a live connection afterwards"""
+        request_sent = False
+        response_done = asyncio.Event()
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await response_done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                headers.update(message["headers"])
+            elif not message.get("more_body", False):
+                response_done.set()
+
+        await app(scope, receive, send)
+
+    # Warm up before timing
+    for _ in range(200):
+        await request()
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await request()
+    elapsed = time.perf_counter() - start
+
+    return elapsed / requests, headers
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20_000, help="Requests per stack")
+    args = parser.parse_args()
+
+    results = {}
+    for name, middleware in STACKS.items():
+        per_request, headers = await run(build_app(middleware), args.requests)
+        results[name] = per_request
+        has_headers = b"x-process-time" in headers and b"x-frame-options" in headers
+        print(f"{name:<20}{per_request * 1e6:>9.1f} us/request   headers={has_headers}")
+
+    baseline = results["none"]
+    for name in ("BaseHTTPMiddleware", "pure ASGI"):
+        print(f"{name} overhead: {(results[name] - baseline) * 1e6:.1f} us/request")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
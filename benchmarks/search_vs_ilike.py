@@ -0,0 +1,105 @@
+"""
+Compare full text search against a naive ILIKE scan
+
+Seeds a throwaway SQLite database with --rows todos, built like
+seed_data.py's but with titles and descriptions drawn from a fixed
+vocabulary, spread evenly over --users owners, then times the /todos/search
+query (FTS5, ranked) and the equivalent ILIKE query for the same owner and
+search terms. The database is created through init_db, so the todos_fts
+index and its triggers are maintained during seeding exactly as in
+production.
+
+Usage:
+    python benchmarks/search_vs_ilike.py --rows 1000000 --users 1
+    python benchmarks/search_vs_ilike.py --rows 1000000 --users 100
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from _common import seed_todos, temp_dir  # noqa: E402
+
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{temp_dir()}/search.db"
+os.environ["DEBUG"] = "false"
+
+import logging  # noqa: E402
+
+from sqlalchemy import or_, select, text  # noqa: E402
+
+from database import AsyncSessionLocal, engine, init_db  # noqa: E402
+from models import Todo  # noqa: E402
+from search import search_query  # noqa: E402
+
+logging.disable(logging.INFO)
+
+# Common words appear in most todos; rare ones in a handful
+VOCABULARY = [f"word{i}" for i in range(5000)]
+SEARCHES = ("word7", "word4999", "word12 word40", "word3000 word3001")
+# Zipf-like: low-numbered words are far more frequent
+CUM_WEIGHTS = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(VOCABULARY))))
+
+
+def vocabulary_text(rng, todo: dict) -> None:
+    """Replace a seeded todo's text with words from VOCABULARY"""
+    todo["title"] = " ".join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=4))
+    todo["description"] = " ".join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=12))
+
+
+def ilike_query(owner_id: int, q: str):
+    """Naive substring search requiring every term, newest first"""
+    query = select(Todo).where(Todo.owner_id == owner_id)
+    for term in q.split():
+        pattern = f"%{term}%"
+        query = query.where(or_(Todo.title.ilike(pattern), Todo.description.ilike(pattern)))
+    return query.order_by(Todo.created_at.desc(), Todo.id.desc())
+
+
+async def time_query(query, repeat: int) -> tuple[float, int]:
+    """Median wall time in milliseconds for the first page of a query"""
+    samples = []
+    async with AsyncSessionLocal() as db:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            todos = (await db.execute(query.limit(10))).scalars().all()
+            samples.append((time.perf_counter() - start) * 1000)
+            db.expunge_all()
+    return statistics.median(samples), len(todos)
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Todos to seed")
+    parser.add_argument("--users", type=int, default=1, help="Owners to spread todos over")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per query")
+    args = parser.parse_args()
+
+    await init_db()
+
+    start = time.perf_counter()
+    users = await seed_todos(args.rows, args.users, seed=42, customize=vocabulary_text)
+    owner_id = users[0]["id"]
+    async with engine.begin() as conn:
+        await conn.execute(text("ANALYZE"))
+    print(f"seeded {args.rows} rows for {args.users} users in {time.perf_counter() - start:.1f}s")
+
+    print(f"{'query':<22}{'fts ms':>10}{'ilike ms':>12}{'speedup':>10}")
+    for q in SEARCHES:
+        fts_ms, fts_hits = await time_query(search_query("sqlite", owner_id, q), args.repeat)
+        ilike_ms, ilike_hits = await time_query(ilike_query(owner_id, q), args.repeat)
+        print(
+            f"{q:<22}{fts_ms:>10.1f}{ilike_ms:>12.1f}{ilike_ms / fts_ms:>9.1f}x"
+            f"   ({fts_hits}/{ilike_hits} hits on first page)"
+        )
+
+    await engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
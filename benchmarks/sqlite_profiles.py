@@ -0,0 +1,152 @@
+"""
+Compare the default and production SQLite profiles under concurrent reads and writes
+
+For each configuration (SQLITE_PROFILE, optionally with the group commit
+write queue), runs the real application in a fresh process
+against a throwaway SQLite file, with --readers clients listing todos and
+--writers clients creating and toggling todos at the same time, and
+reports throughput, latency and failed requests for each side.
+
+Usage:
+    python benchmarks/sqlite_profiles.py --readers 16 --writers 8 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from _common import percentile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Configuration name -> environment overrides
+CONFIGURATIONS = {
+    "default": {"SQLITE_PROFILE": "default"},
+    "default+queue": {"SQLITE_PROFILE": "default", "WRITE_QUEUE_ENABLED": "true"},
+    "production": {"SQLITE_PROFILE": "production"},
+    "prod+queue": {"SQLITE_PROFILE": "production", "WRITE_QUEUE_ENABLED": "true"},
+}
+
+
+def summarize(latencies: list[float], failures: int, duration: float) -> dict:
+    return {
+        "ok": len(latencies),
+        "failed": failures,
+        "per_second": len(latencies) / duration,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+async def run_child(readers: int, writers: int, duration: float) -> dict:
+    """Run the workload against the application configured by the environment"""
+    sys.path.insert(0, ROOT)
+
+    import logging
+
+    import httpx
+
+    from main import app
+
+    logging.disable(logging.WARNING)
+
+    results = {"read": ([], [0]), "write": ([], [0])}
+
+    async def reader(client, headers, stop_at):
+        latencies, failures = results["read"]
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            response = await client.get("/todos/?limit=20", headers=headers)
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                failures[0] += 1
+
+    async def writer(client, headers, stop_at, n):
+        latencies, failures = results["write"]
+        i = 0
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            response = await client.post("/todos/", json={"title": f"w{n}-{i}"}, headers=headers)
+            if response.status_code == 201:
+                response = await client.patch(
+                    f"/todos/{response.json()['id']}/complete", headers=headers
+                )
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                failures[0] += 1
+            i += 1
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            await client.post("/auth/register", json={
+                "email": "bench@example.com", "username": "bench_user", "password": "bench-password"
+            })
+            response = await client.post(
+                "/auth/login", data={"username": "bench_user", "password": "bench-password"}
+            )
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            for i in range(50):
+                await client.post("/todos/", json={"title": f"seed {i}"}, headers=headers)
+
+            stop_at = time.perf_counter() + duration
+            await asyncio.gather(
+                *(reader(client, headers, stop_at) for _ in range(readers)),
+                *(writer(client, headers, stop_at, n) for n in range(writers))
+            )
+
+    return {
+        side: summarize(latencies, failures[0], duration)
+        for side, (latencies, failures) in results.items()
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--readers", type=int, default=16, help="Concurrent list clients")
+    parser.add_argument("--writers", type=int, default=8, help="Concurrent create+toggle clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per configuration")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(run_child(args.readers, args.writers, args.duration))))
+        return 0
+
+    for name, overrides in CONFIGURATIONS.items():
+        with tempfile.TemporaryDirectory(prefix="todo-bench-") as db_dir:
+            env = {
+                **os.environ,
+                "DATABASE_URL": f"sqlite+aiosqlite:///{db_dir}/profile.db",
+                "DEBUG": "false",
+                "ADMIN_STATS_REFRESH_SECONDS": "0",
+                "RATE_LIMIT_ENABLED": "false",
+                **overrides,
+            }
+            output = subprocess.run(
+                [sys.executable, __file__, "--child", "--readers", str(args.readers),
+                 "--writers", str(args.writers), "--duration", str(args.duration)],
+                env=env, capture_output=True, text=True, check=True
+            ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+
+        for side in ("read", "write"):
+            r = result[side]
+            print(
+                f"{name:<13} {side:<5} ok={r['ok']:<6} failed={r['failed']:<4} "
+                f"{r['per_second']:>7.1f}/s p50={r['p50_ms']:.1f}ms p99={r['p99_ms']:.1f}ms"
+            )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
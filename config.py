@@ -11,18 +11,142 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
     
+    # Password hashing
+    # Worker threads for bcrypt (0 hashes inline on the event loop) and how
+    # many extra requests may wait for a worker before getting a 503
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 32
+    PASSWORD_HASH_RETRY_AFTER_SECONDS: int = 1
+    
     # Database
     DATABASE_URL: str = "sqlite+aiosqlite:///./todo.db"
+    # Optional read replica for read-only routes
+    DATABASE_READ_URL: str | None = None
+    # After a user commits a write, their reads go to the primary for this
+    # long so replica lag cannot hide it (tracked per worker process)
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+    
+    # Connection pool for server databases (SQLite keeps driver defaults)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: int = 30
+    DB_POOL_PRE_PING: bool = True
+    # Reconnect before RDS or a proxy drops idle connections
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    # Prepared statements cached per asyncpg connection (0 disables, as
+    # required behind PgBouncer in transaction mode)
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    
+    # SQLite profile: "default" uses a single engine with driver defaults;
+    # "production" enables WAL with tuned pragmas and splits connections into
+    # a pool of read-only readers and a single writer
+    SQLITE_PROFILE: str = "default"
+    SQLITE_READ_POOL_SIZE: int = 8
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE_KIB: int = 65536
+    SQLITE_MMAP_SIZE: int = 268435456
+    # How long a request may wait for the writer connection
+    SQLITE_WRITER_TIMEOUT_SECONDS: int = 30
     
+    # Group commit: single-todo writes are queued to one writer task that
+    # applies up to WRITE_QUEUE_MAX_BATCH of them per transaction, waiting
+    # at most WRITE_QUEUE_MAX_DELAY_MS for a batch to fill
+    WRITE_QUEUE_ENABLED: bool = False
+    WRITE_QUEUE_MAX_BATCH: int = 64
+    WRITE_QUEUE_MAX_DELAY_MS: int = 2
+    
+    # Rows read per page, each in its own short read, when streaming exports
+    EXPORT_BATCH_SIZE: int = 1000
+    # Rows inserted and committed per transaction when importing
+    IMPORT_CHUNK_SIZE: int = 1000
+
     # Application
     APP_NAME: str = "Todo API"
     APP_VERSION: str = "1.0.0"
     DEBUG: bool = True
     PORT: int = 8080
+    # Skip schema DDL at startup while the stored schema fingerprint matches
+    # the models; disable to always run it (e.g. after editing the schema by hand)
+    FAST_STARTUP: bool = True
+    
+    # Logging
+    # "text" writes classic log lines synchronously; "json" writes one JSON
+    # object per line from a background thread, with a single combined
+    # access record per request
+    LOG_FORMAT: str = "text"
+    LOG_LEVEL: str = "INFO"
+    # Fraction of successful requests written to the JSON access log;
+    # responses with status >= 400 and failed requests are always kept
+    ACCESS_LOG_SAMPLE_RATE: float = 1.0
+    
+    # Metrics
+    # Serve Prometheus metrics at /metrics
+    METRICS_ENABLED: bool = True
+    # Scrapers must send "Authorization: Bearer <token>"; when empty, only
+    # clients on the loopback interface may scrape
+    METRICS_TOKEN: str = ""
+    # In DEBUG mode, warn when a request runs one statement shape more
+    # than this many times (0 disables the check)
+    QUERY_REPEAT_WARN_THRESHOLD: int = 10
     
     # Rate Limiting
+    # Token buckets per authenticated user, or per client IP otherwise,
+    # holding this many tokens and refilling evenly over the period.
+    # RATE_LIMIT_GLOBAL covers every route at one token per request and is
+    # sized for the SPA, which refetches the list and stats after each edit
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_GLOBAL: str = "600/minute"
+    # Routes exempt from the global budget
+    RATE_LIMIT_EXEMPT_ROUTES: list[str] = ["GET /health", "GET /metrics"]
+    # Strict budget for the routes in RATE_LIMIT_ROUTE_COSTS, which take
+    # their cost in tokens from it on top of the global budget
     RATE_LIMIT_PER_MINUTE: str = "60/minute"
-    
+    RATE_LIMIT_ROUTE_COSTS: dict[str, int] = {
+        "GET /": 1,
+        "POST /auth/login": 1,
+        "POST /auth/register": 5,
+        "POST /auth/refresh": 1,
+        "POST /todos/import": 5,
+    }
+    # "memory" keeps buckets per worker process, so N workers allow N
+    # times the limits; "sqlite" shares them between the workers on one
+    # host through a local file. "auto" uses "sqlite" when running as one
+    # of several workers (WEB_CONCURRENCY > 1 or uvicorn --workers) and
+    # "memory" otherwise.
+    RATE_LIMIT_BACKEND: str = "auto"
+    RATE_LIMIT_SQLITE_PATH: str = "./ratelimit.db"
+
+    # Admission control
+    # Requests handled at once per route class; excess requests wait in a
+    # FIFO queue of at most ADMISSION_MAX_QUEUE per class and are rejected
+    # with 503 when it is full or they waited ADMISSION_QUEUE_TIMEOUT_MS.
+    # Streaming exports keep their slot until the last row is sent
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_LIMITS: dict[str, int] = {
+        "auth": 16, "read": 64, "write": 32, "admin": 8, "export": 4
+    }
+    ADMISSION_MAX_QUEUE: int = 64
+    ADMISSION_QUEUE_TIMEOUT_MS: int = 1000
+    ADMISSION_RETRY_AFTER_SECONDS: int = 1
+    # Adapt each limit between ADMISSION_MIN_LIMIT and its configured value:
+    # cut it by 10% when a request takes longer than the target latency to
+    # start its response (at most once per latency window), and grow it
+    # slowly while requests are fast and the limit is in use
+    ADMISSION_ADAPTIVE: bool = False
+    ADMISSION_TARGET_LATENCY_MS: int = 250
+    ADMISSION_MIN_LIMIT: int = 2
+
+    # Caching
+    # Authenticated users are cached per worker process; admin changes
+    # invalidate the local worker immediately and other workers within the
+    # TTL, so it bounds how long a deactivated or demoted user keeps access
+    # when running more than one worker
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 5
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10000
+    # Admin system overview is served from a snapshot refreshed this often
+    # (0 computes it on every request)
+    ADMIN_STATS_REFRESH_SECONDS: int = 30
+
     # AWS Elastic Beanstalk
     # EB will inject these automatically if using RDS
     RDS_HOSTNAME: str | None = None
@@ -0,0 +1,242 @@
+from typing import Optional
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import Todo, TodoCounter, TodoPriority, User
+from database import AsyncSessionLocal
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Counter column for each priority
+PRIORITY_COLUMNS = {
+    TodoPriority.LOW: TodoCounter.priority_low,
+    TodoPriority.MEDIUM: TodoCounter.priority_medium,
+    TodoPriority.HIGH: TodoCounter.priority_high,
+}
+
+COUNTER_FIELDS = ("total", "completed", "priority_low", "priority_medium", "priority_high")
+
+
+async def adjust_todo_counters(
+    db: AsyncSession,
+    user_id: int,
+    total: int = 0,
+    completed: int = 0,
+    by_priority: Optional[dict] = None
+) -> Optional[int]:
+    """
+    Apply deltas to a user's todo counters in the current transaction
+
+    Every call also bumps the user's data version, so it must be made for
+    any write to the user's todos. The update is a single relative UPDATE
+    so concurrent writers do not lose increments. Users without a counters
+    row are skipped; their counters are rebuilt on the next read.
+
+    Args:
+        db: Database session
+        user_id: Owner of the todos
+        total: Change in total todo count
+        completed: Change in completed todo count
+        by_priority: Change in count per TodoPriority
+
+    Returns:
+        New data version, or None if the user has no counters row
+    """
+    values = {"version": TodoCounter.version + 1}
+
+    if total:
+        values["total"] = TodoCounter.total + total
+    if completed:
+        values["completed"] = TodoCounter.completed + completed
+    for priority, delta in (by_priority or {}).items():
+        if delta:
+            column = PRIORITY_COLUMNS[TodoPriority(priority)]
+            values[column.key] = column + delta
+
+    result = await db.execute(
+        update(TodoCounter)
+        .where(TodoCounter.user_id == user_id)
+        .values(**values)
+        .returning(TodoCounter.version)
+    )
+    return result.scalar_one_or_none()
+
+
+async def lock_todo_counters(db: AsyncSession, user_id: int) -> None:
+    """
+    Take the write lock before reading state that counter deltas come from
+
+    PostgreSQL locks the rows read with FOR UPDATE, but SQLite ignores it
+    and pysqlite runs a SELECT before its implicit BEGIN, so a concurrent
+    writer can change the rows between the read and the UPDATE. On SQLite
+    a no-op UPDATE starts the write transaction first; it takes the
+    database lock even if the user has no counters row.
+
+    Args:
+        db: Database session
+        user_id: Owner of the todos
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        return
+
+    await db.execute(
+        update(TodoCounter)
+        .where(TodoCounter.user_id == user_id)
+        .values(version=TodoCounter.version)
+    )
+
+
+async def lock_todo_version(db: AsyncSession, user_id: int, version: int) -> bool:
+    """
+    Check a user's data version is unchanged and hold it for this transaction
+
+    The no-op UPDATE takes the row lock, so a concurrent writer that read
+    the same version waits and then fails the check.
+
+    Args:
+        db: Database session
+        user_id: Owner of the todos
+        version: Version the client last saw
+
+    Returns:
+        True if the version still matches
+    """
+    result = await db.execute(
+        update(TodoCounter)
+        .where(TodoCounter.user_id == user_id, TodoCounter.version == version)
+        .values(version=TodoCounter.version)
+    )
+    return result.rowcount == 1
+
+
+async def count_todos(db: AsyncSession, user_id: Optional[int] = None) -> dict:
+    """
+    Count todos from the todos table in a single aggregate pass
+
+    Args:
+        db: Database session
+        user_id: Only count this user's todos (optional)
+
+    Returns:
+        Dictionary mapping user id to a dictionary of counter fields
+    """
+    query = select(
+        Todo.owner_id, Todo.is_completed, Todo.priority, func.count(Todo.id)
+    ).group_by(Todo.owner_id, Todo.is_completed, Todo.priority)
+
+    if user_id is not None:
+        query = query.where(Todo.owner_id == user_id)
+
+    counts: dict = {}
+    for owner_id, is_completed, priority, count in (await db.execute(query)).all():
+        row = counts.setdefault(owner_id, dict.fromkeys(COUNTER_FIELDS, 0))
+        row["total"] += count
+        if is_completed:
+            row["completed"] += count
+        row[PRIORITY_COLUMNS[priority].key] += count
+
+    return counts
+
+
+async def get_todo_counters(db: AsyncSession, user_id: int) -> TodoCounter:
+    """
+    Get a user's todo counters, rebuilding them if the row is missing
+
+    The rebuilt row is flushed in the caller's transaction, never
+    committed, so the caller's pending writes are left for it to commit or
+    roll back. Read sessions rebuild it in a separate write session
+    instead, which commits it.
+
+    Args:
+        db: Database session
+        user_id: User whose counters to fetch
+
+    Returns:
+        TodoCounter for the user
+    """
+    counter = await db.get(TodoCounter, user_id)
+    if counter is not None:
+        return counter
+
+    if db.info.get("read_only"):
+        # Read sessions cannot store the rebuilt row
+        async with AsyncSessionLocal() as writer:
+            counter = await get_todo_counters(writer, user_id)
+            await writer.commit()
+            return counter
+
+    counts = await count_todos(db, user_id)
+    counter = TodoCounter(
+        user_id=user_id,
+        **counts.get(user_id, dict.fromkeys(COUNTER_FIELDS, 0))
+    )
+
+    try:
+        async with db.begin_nested():
+            db.add(counter)
+            await db.flush()
+    except IntegrityError:
+        # A concurrent request created the row first; only the savepoint
+        # is rolled back
+        counter = await db.get(TodoCounter, user_id)
+
+    return counter
+
+
+async def reconcile_todo_counters(db: AsyncSession, fix: bool = True) -> list[dict]:
+    """
+    Rebuild all counters from the todos table and report drift
+
+    Args:
+        db: Database session
+        fix: Whether to write the rebuilt counters
+
+    Returns:
+        List of drift records with the user id, stored and actual counts
+    """
+    actual = await count_todos(db)
+    stored = {
+        counter.user_id: counter
+        for counter in (await db.execute(select(TodoCounter))).scalars()
+    }
+    user_ids = set((await db.execute(select(User.id))).scalars())
+
+    drift = []
+    for user_id in sorted(user_ids):
+        expected = actual.get(user_id, dict.fromkeys(COUNTER_FIELDS, 0))
+        counter = stored.get(user_id)
+        current = (
+            {field: getattr(counter, field) for field in COUNTER_FIELDS}
+            if counter is not None else None
+        )
+
+        if current == expected:
+            continue
+
+        drift.append({"user_id": user_id, "stored": current, "actual": expected})
+
+        if fix:
+            if counter is None:
+                db.add(TodoCounter(user_id=user_id, **expected))
+            else:
+                for field, value in expected.items():
+                    setattr(counter, field, value)
+                counter.version += 1
+
+    orphaned = set(stored) - user_ids
+    for user_id in sorted(orphaned):
+        counter = stored[user_id]
+        drift.append({
+            "user_id": user_id,
+            "stored": {field: getattr(counter, field) for field in COUNTER_FIELDS},
+            "actual": None
+        })
+
+    if fix:
+        if orphaned:
+            await db.execute(delete(TodoCounter).where(TodoCounter.user_id.in_(orphaned)))
+        await db.commit()
+        logger.info(f"Todo counters reconciled: {len(drift)} users drifted")
+
+    return drift
@@ -1,25 +1,284 @@
+import hashlib
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import (
+    Column, Integer, String, Table, event, inspect, make_url, select, text
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.schema import CreateIndex, CreateTable
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.orm import Session, declarative_base
 from config import get_settings
 
 settings = get_settings()
 
-# Create async engine
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=settings.DEBUG,
-    future=True
-)
+
+def _pool_options(url: str) -> dict:
+    """
+    Connection pool options for a server database URL
+    
+    SQLite URLs keep the driver defaults. For asyncpg the statement cache
+    size applies to both SQLAlchemy's and asyncpg's prepared statement
+    caches; set it to 0 behind a transaction-pooling PgBouncer.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        return {}
+    
+    options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+    }
+    if parsed.get_driver_name() == "asyncpg":
+        options["connect_args"] = {
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+    return options
+
+
+def _sqlite_file_path(url: str) -> Optional[str]:
+    """Database file of a SQLite URL, or None for other databases and :memory:"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite" or parsed.database in (None, "", ":memory:"):
+        return None
+    return parsed.database
+
+
+def _apply_sqlite_pragmas(engine, pragmas: dict) -> None:
+    """Run PRAGMA statements on every new connection of an engine"""
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def _create_sqlite_production_engines(url: str, path: str):
+    """
+    Create the single writer engine and the read-only reader engine
+    
+    WAL lets readers run alongside the writer, and a single writer
+    connection queues writes in the pool instead of failing with
+    "database is locked".
+    """
+    tuning = {
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+        "cache_size": -settings.SQLITE_CACHE_SIZE_KIB,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+    }
+    
+    writer = create_async_engine(
+        url,
+        echo=settings.DEBUG,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=settings.SQLITE_WRITER_TIMEOUT_SECONDS
+    )
+    _apply_sqlite_pragmas(writer, {"journal_mode": "WAL", "synchronous": "NORMAL", **tuning})
+    
+    reader_url = make_url(url).set(database=f"file:{path}", query={"mode": "ro", "uri": "true"})
+    reader = create_async_engine(
+        reader_url,
+        echo=settings.DEBUG,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=settings.SQLITE_READ_POOL_SIZE,
+        max_overflow=0
+    )
+    _apply_sqlite_pragmas(reader, tuning)
+    
+    return writer, reader
+
+
+_sqlite_path = _sqlite_file_path(settings.DATABASE_URL)
+
+if settings.SQLITE_PROFILE == "production" and _sqlite_path is not None:
+    engine, read_engine = _create_sqlite_production_engines(settings.DATABASE_URL, _sqlite_path)
+else:
+    # Create async engine
+    engine = create_async_engine(
+        settings.DATABASE_URL,
+        echo=settings.DEBUG,
+        future=True,
+        **_pool_options(settings.DATABASE_URL)
+    )
+    read_engine = engine
+
+if settings.DATABASE_READ_URL:
+    # Replica for read-only sessions
+    read_engine = create_async_engine(
+        settings.DATABASE_READ_URL,
+        echo=settings.DEBUG,
+        future=True,
+        **_pool_options(settings.DATABASE_READ_URL)
+    )
+
+
+class QueryStats:
+    """Statements executed on behalf of one request"""
+    
+    __slots__ = ("count", "duration", "shapes")
+    
+    def __init__(self, track_shapes: bool = False):
+        self.count = 0
+        self.duration = 0.0
+        # Statement shape -> executions, only collected when tracking shapes
+        self.shapes: Optional[Counter] = Counter() if track_shapes else None
+
+
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+# Collapses parameter lists so IN (?, ?) and IN (?, ?, ?) share a shape
+_PARAM_LIST = re.compile(r"\(\s*(?:\?|\$\d+|%\(\w+\)s)(?:\s*,\s*(?:\?|\$\d+|%\(\w+\)s))*\s*\)")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize a SQL statement so repeats with different parameters match"""
+    return _PARAM_LIST.sub("(?)", " ".join(statement.split()))
+
+
+def track_queries(track_shapes: bool = False) -> QueryStats:
+    """
+    Start counting statements for the current request
+    
+    Engine events record into the returned object for every statement run
+    from this context, including inside SQLAlchemy's async greenlets, which
+    run with the calling task's context.
+    
+    Args:
+        track_shapes: Also count executions per statement shape
+        
+    Returns:
+        QueryStats updated as statements run
+    """
+    stats = QueryStats(track_shapes)
+    _query_stats.set(stats)
+    return stats
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    """Statement stats for the current request, if it is being tracked"""
+    return _query_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _query_stats.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _query_stats.get()
+    if stats is None or not conn.info.get("query_start"):
+        return
+    
+    stats.count += 1
+    stats.duration += time.perf_counter() - conn.info["query_start"].pop()
+    if stats.shapes is not None:
+        stats.shapes[statement_shape(statement)] += 1
+
+
+def _handle_error(exception_context):
+    # Failed statements never reach after_cursor_execute
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
+
+# Engines used by the application, without duplicates
+engines = (engine,) if read_engine is engine else (engine, read_engine)
+
+for _engine in engines:
+    event.listen(_engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(_engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(_engine.sync_engine, "handle_error", _handle_error)
+
+
+# Read-your-writes: with a replica configured, reads by a user who
+# committed a write within READ_YOUR_WRITES_SECONDS go to the primary.
+# Tracked per worker process.
+_read_your_writes = bool(settings.DATABASE_READ_URL) and settings.READ_YOUR_WRITES_SECONDS > 0
+_acting_user: ContextVar[Optional[int]] = ContextVar("acting_user", default=None)
+# User id -> monotonic time of the user's last committed write
+_recent_writes: dict = {}
+
+
+def set_acting_user(user_id: int) -> None:
+    """Record the authenticated user the current request acts for"""
+    _acting_user.set(user_id)
+
+
+def note_write() -> None:
+    """Record that the acting user just committed a write"""
+    user_id = _acting_user.get()
+    if not _read_your_writes or user_id is None:
+        return
+    
+    now = time.monotonic()
+    if len(_recent_writes) > 10000:
+        cutoff = now - settings.READ_YOUR_WRITES_SECONDS
+        for stale in [uid for uid, at in _recent_writes.items() if at < cutoff]:
+            del _recent_writes[stale]
+    _recent_writes[user_id] = now
+
+
+def _wrote_recently(user_id: Optional[int]) -> bool:
+    written_at = _recent_writes.get(user_id)
+    return (
+        written_at is not None
+        and time.monotonic() - written_at < settings.READ_YOUR_WRITES_SECONDS
+    )
+
+
+class _PrimarySession(Session):
+    """Session on the primary; commits start the read-your-writes window"""
+
+
+class _ReadSession(Session):
+    """Session on the read engine, switching to the primary after own writes"""
+    
+    def get_bind(self, *args, **kwargs):
+        if _read_your_writes and _wrote_recently(_acting_user.get()):
+            return engine.sync_engine
+        return super().get_bind(*args, **kwargs)
+
+
+@event.listens_for(_PrimarySession, "after_commit")
+def _after_commit(session):
+    note_write()
+
 
 # Create async session factory
 AsyncSessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
+    sync_session_class=_PrimarySession,
     expire_on_commit=False,
     autocommit=False,
     autoflush=False
 )
 
+# Session factory for read-only work; the same engine unless a separate
+# reader or replica is configured. Sessions are marked read-only either
+# way, since read routes never commit
+ReadSessionLocal = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    sync_session_class=_ReadSession,
+    expire_on_commit=False,
+    autocommit=False,
+    autoflush=False,
+    info={"read_only": True}
+)
+
 # Base class for models
 Base = declarative_base()
 
@@ -33,7 +292,194 @@ async def get_db():
             await session.close()
 
 
-async def init_db():
-    """Initialize database tables"""
+async def get_read_db():
+    """Dependency for getting async database sessions for read-only routes"""
+    async with ReadSessionLocal() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+# Advisory lock key serializing schema changes on PostgreSQL
+SCHEMA_LOCK_ID = 7_406_001
+
+# Fingerprint of the schema the database was last brought up to date with
+schema_version = Table(
+    "schema_version",
+    Base.metadata,
+    Column("id", Integer, primary_key=True),
+    Column("fingerprint", String(64), nullable=False)
+)
+
+
+def schema_fingerprint(dialect) -> str:
+    """
+    Hash of the DDL the models and search index compile to for a dialect
+    
+    Any change to a table, column, index or the search DDL changes it, so
+    it doubles as an automatic schema version.
+    """
+    statements = []
+    for table in Base.metadata.sorted_tables:
+        statements.append(str(CreateTable(table).compile(dialect=dialect)))
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            statements.append(str(CreateIndex(index).compile(dialect=dialect)))
+    statements.extend(SQLITE_SEARCH_DDL)
+    
+    return hashlib.sha256("\n".join(statements).encode()).hexdigest()
+
+
+async def init_db(force: bool = False) -> bool:
+    """
+    Initialize database tables
+    
+    DDL is skipped when the stored schema fingerprint matches the models,
+    which costs a single query instead of reflecting every table. Otherwise
+    the schema is locked first, so workers starting at the same time bring
+    it up to date one after another rather than racing on the DDL.
+    
+    Args:
+        force: Run the DDL even if the stored fingerprint matches
+        
+    Returns:
+        True if the DDL was run
+    """
+    fingerprint = schema_fingerprint(engine.dialect)
+    
     async with engine.begin() as conn:
+        if not force and await conn.run_sync(_stored_fingerprint) == fingerprint:
+            return False
+        
+        await conn.run_sync(_lock_schema)
+        # Another worker may have finished while this one waited for the lock
+        if not force and await conn.run_sync(_stored_fingerprint) == fingerprint:
+            return False
+        
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(_create_missing_indexes)
+        await conn.run_sync(_create_search_index)
+        
+        await conn.execute(_store_fingerprint(conn.dialect.name, fingerprint))
+    
+    return True
+
+
+def _lock_schema(connection):
+    """Hold a lock on schema changes until the transaction ends"""
+    if connection.dialect.name == "postgresql":
+        connection.execute(select(text(f"pg_advisory_xact_lock({SCHEMA_LOCK_ID})")))
+    elif connection.dialect.name == "sqlite":
+        # The driver only opens a transaction before DML; take the write lock
+        # now so the DDL below runs in it
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def _store_fingerprint(dialect_name: str, fingerprint: str):
+    """
+    Upsert the schema_version row
+    
+    A single statement, so a worker never sees the row missing and never
+    collides with another on the primary key.
+    """
+    dialect_insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    statement = dialect_insert(schema_version).values(id=1, fingerprint=fingerprint)
+    return statement.on_conflict_do_update(
+        index_elements=[schema_version.c.id],
+        set_={"fingerprint": statement.excluded.fingerprint}
+    )
+
+
+def _stored_fingerprint(connection) -> Optional[str]:
+    if not inspect(connection).has_table(schema_version.name):
+        return None
+    return connection.execute(
+        select(schema_version.c.fingerprint).where(schema_version.c.id == 1)
+    ).scalar_one_or_none()
+
+
+def _add_missing_columns(connection):
+    """
+    Add columns added to models after their table already existed
+    
+    New columns must be nullable or have a server default.
+    """
+    inspector = inspect(connection)
+    
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            
+            column_type = column.type.compile(dialect=connection.dialect)
+            default = ""
+            if column.server_default is not None:
+                default = f" DEFAULT {column.server_default.arg}"
+            
+            connection.execute(text(
+                f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}{default}"
+            ))
+
+
+def _create_missing_indexes(connection):
+    """Create indexes added to models after their table already existed"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+# SQLite full text index over todo titles and descriptions. It is an
+# external-content FTS5 table kept in sync with todos by triggers, so the
+# text is stored once and every write path stays covered.
+SQLITE_SEARCH_DDL = (
+    """
+    CREATE VIRTUAL TABLE todos_fts USING fts5(
+        title, description,
+        content='todos', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_insert AFTER INSERT ON todos BEGIN
+        INSERT INTO todos_fts (rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_delete AFTER DELETE ON todos BEGIN
+        INSERT INTO todos_fts (todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_update AFTER UPDATE OF title, description ON todos BEGIN
+        INSERT INTO todos_fts (todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO todos_fts (rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+)
+
+
+def _create_search_index(connection):
+    """
+    Create the SQLite full text index, backfilling it from existing todos
+    
+    Postgres uses the ix_todos_search expression index defined on the model.
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    
+    create_table, *triggers = SQLITE_SEARCH_DDL
+    created = not inspect(connection).has_table("todos_fts")
+    
+    if created:
+        connection.execute(text(create_table))
+    for trigger in triggers:
+        connection.execute(text(trigger))
+    if created:
+        connection.execute(text("INSERT INTO todos_fts (todos_fts) VALUES ('rebuild')"))
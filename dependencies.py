@@ -2,9 +2,10 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from database import get_db
+from database import get_db, set_acting_user
 from models import User, UserRole
-from auth import verify_token
+from auth import verify_access_token
+from cache import principal_cache
 from schemas import TokenData
 
 # OAuth2 scheme for token authentication
@@ -35,19 +36,29 @@ async def get_current_user(
     )
     
     # Verify token
-    token_data: TokenData = verify_token(token, token_type="access")
+    token_data: TokenData = verify_access_token(token)
     
     if token_data is None or token_data.username is None:
         raise credentials_exception
     
-    # Get user from database
-    result = await db.execute(
-        select(User).where(User.username == token_data.username)
-    )
-    user = result.scalar_one_or_none()
-    
-    if user is None:
-        raise credentials_exception
+    # Get user from the principal cache, falling back to the database
+    user = principal_cache.get(token_data.user_id)
+
+    if user is None or user.username != token_data.username:
+        result = await db.execute(
+            select(User).where(User.username == token_data.username)
+        )
+        user = result.scalar_one_or_none()
+
+        if user is None:
+            raise credentials_exception
+
+        # Detach so the cached instance can be shared across sessions
+        db.expunge(user)
+        principal_cache.set(user.id, user)
+        # Read on the primary so deactivations apply at once; end the read
+        # so the connection is not held for the rest of the request
+        await db.rollback()
     
     if not user.is_active:
         raise HTTPException(
@@ -55,6 +66,9 @@ async def get_current_user(
             detail="User account is inactive"
         )
     
+    # Lets read sessions follow this user's own recent writes
+    set_acting_user(user.id)
+    
     return user
 
 
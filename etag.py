@@ -0,0 +1,124 @@
+import hashlib
+from typing import Optional
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from counters import get_todo_counters, lock_todo_version
+
+# Responses must be revalidated, and only private caches may store them
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(kind: str, user_id: int, version: int, *parts) -> str:
+    """
+    Build a strong ETag from a user's data version
+
+    Args:
+        kind: Resource kind, e.g. "todos" or "stats"
+        user_id: Owner of the data
+        version: User's current data version
+        *parts: Anything else the representation depends on
+
+    Returns:
+        Quoted entity tag
+    """
+    tag = f"{kind}-{user_id}-{version}"
+    if parts:
+        digest = hashlib.blake2b(
+            "|".join(str(part) for part in parts).encode(), digest_size=8
+        ).hexdigest()
+        tag = f"{tag}-{digest}"
+    return f'"{tag}"'
+
+
+def etag_matches(header: Optional[str], etag: str, weak: bool = True) -> bool:
+    """
+    Check an If-None-Match / If-Match header against an ETag
+
+    Args:
+        header: Header value (comma separated entity tags or "*")
+        etag: Current entity tag
+        weak: Use weak comparison (If-None-Match) rather than strong (If-Match)
+
+    Returns:
+        True if any listed tag matches
+    """
+    if not header:
+        return False
+
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            if not weak:
+                continue
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+
+    return False
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """
+    Get a 304 response if the client already has the current representation
+
+    Args:
+        request: Incoming request
+        etag: Current entity tag
+
+    Returns:
+        304 response, or None if the full response is needed
+    """
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        )
+    return None
+
+
+def set_etag(response: Response, etag: str) -> None:
+    """Attach an ETag and revalidation policy to a response"""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+
+async def get_data_version(db: AsyncSession, user_id: int) -> int:
+    """Get a user's current data version"""
+    return (await get_todo_counters(db, user_id)).version
+
+
+async def check_if_match(
+    request: Request,
+    db: AsyncSession,
+    user_id: int,
+    todo_id: int
+) -> None:
+    """
+    Enforce an If-Match precondition on a write to a single todo
+
+    The user's data version is held for the rest of the transaction, so
+    of two writers holding the same ETag only the first succeeds.
+
+    Args:
+        request: Incoming request
+        db: Database session
+        user_id: Owner of the todo
+        todo_id: ID of the todo being written
+
+    Raises:
+        HTTPException: 412 if the client's ETag is stale
+    """
+    if_match = request.headers.get("if-match")
+    if if_match is None:
+        return
+
+    version = await get_data_version(db, user_id)
+    etag = make_etag("todo", user_id, version, todo_id)
+
+    if not etag_matches(if_match, etag, weak=False) or not await lock_todo_version(db, user_id, version):
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Todo has been modified; fetch it again and retry"
+        )
@@ -0,0 +1,271 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Iterator
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.types import Receive, Scope, Send
+from database import AsyncSessionLocal
+from models import Todo, User
+from schemas import TodoCreate
+from counters import adjust_todo_counters
+from config import get_settings
+import logging
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+IMPORT_FORMATS = ("ndjson", "csv")
+
+# Per-line errors included in the import report; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+# Report fields repeated in each streamed progress record
+PROGRESS_FIELDS = ("processed", "imported", "failed", "chunks")
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, str]]:
+    """
+    Split a byte stream into numbered text lines as it arrives
+
+    Args:
+        chunks: Raw body chunks
+
+    Yields:
+        Tuples of (line number starting at 1, line without newline)
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    line_number = 0
+
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            line_number += 1
+            yield line_number, line.rstrip("\r")
+
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield line_number + 1, pending.rstrip("\r")
+
+
+def _parse_ndjson(line: str) -> dict:
+    data = json.loads(line)
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object")
+    return data
+
+
+def _parse_csv(line: str, header: list[str]) -> dict:
+    values = next(csv.reader([line]))
+    if len(values) != len(header):
+        raise ValueError(f"Expected {len(header)} fields, got {len(values)}")
+    # CSV cannot express null; empty fields fall back to schema defaults
+    return {name: value for name, value in zip(header, values) if value != ""}
+
+
+def _error_messages(error: Exception) -> list[str]:
+    if isinstance(error, ValidationError):
+        return [
+            f"{' -> '.join(str(x) for x in detail['loc'])}: {detail['msg']}"
+            for detail in error.errors()
+        ]
+    return [str(error)]
+
+
+def new_report() -> dict:
+    """Empty import report"""
+    return {
+        "processed": 0,
+        "imported": 0,
+        "failed": 0,
+        "chunks": 0,
+        "errors": [],
+        "errors_truncated": False
+    }
+
+
+async def import_todos(
+    db: AsyncSession,
+    owner: User,
+    lines: AsyncIterator[tuple[int, str]],
+    import_format: str
+) -> dict:
+    """
+    Import todos from NDJSON or CSV lines in chunked transactions
+
+    See import_chunks.
+
+    Args:
+        db: Database session
+        owner: User who will own the imported todos
+        lines: Numbered input lines, e.g. from iter_lines
+        import_format: "ndjson" or "csv"
+
+    Returns:
+        Import report with counts and per-line errors
+    """
+    report = new_report()
+    async for _ in import_chunks(db, owner, lines, import_format, report):
+        pass
+    return report
+
+
+async def import_chunks(
+    db: AsyncSession,
+    owner: User,
+    lines: AsyncIterator[tuple[int, str]],
+    import_format: str,
+    report: dict
+) -> AsyncIterator[dict]:
+    """
+    Import todos from NDJSON or CSV lines, yielding after each committed chunk
+
+    Each line is validated with TodoCreate. Valid rows are inserted with a
+    multi-row INSERT and committed every IMPORT_CHUNK_SIZE rows, together
+    with the owner's counters; invalid lines are reported and skipped.
+    Chunks committed before a failure or disconnect are kept.
+
+    CSV input must start with a header row naming the columns (title,
+    description, priority). Records may not span lines.
+
+    Args:
+        db: Database session
+        owner: User who will own the imported todos
+        lines: Numbered input lines, e.g. from iter_lines
+        import_format: "ndjson" or "csv"
+        report: Report from new_report, updated in place with counts and
+            per-line errors
+
+    Yields:
+        The report, after each chunk is committed
+    """
+    chunk_size = settings.IMPORT_CHUNK_SIZE
+    header = None
+    rows = []
+
+    async def flush():
+        by_priority = {}
+        for row in rows:
+            by_priority[row["priority"]] = by_priority.get(row["priority"], 0) + 1
+
+        await db.execute(insert(Todo), rows)
+        await adjust_todo_counters(db, owner.id, total=len(rows), by_priority=by_priority)
+        await db.commit()
+
+        report["imported"] += len(rows)
+        report["chunks"] += 1
+        rows.clear()
+
+        logger.info(
+            f"Import for user {owner.username}: {report['processed']} lines processed, "
+            f"{report['imported']} imported, {report['failed']} failed"
+        )
+
+    async for line_number, line in lines:
+        if not line.strip():
+            continue
+
+        if import_format == "csv" and header is None:
+            header = [name.strip() for name in next(csv.reader([line]))]
+            continue
+
+        report["processed"] += 1
+
+        try:
+            data = _parse_ndjson(line) if import_format == "ndjson" else _parse_csv(line, header)
+            todo = TodoCreate.model_validate(data)
+        except (ValueError, ValidationError) as e:
+            report["failed"] += 1
+            if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                report["errors"].append({"line": line_number, "errors": _error_messages(e)})
+            else:
+                report["errors_truncated"] = True
+            continue
+
+        rows.append({
+            "title": todo.title,
+            "description": todo.description,
+            "priority": todo.priority,
+            "owner_id": owner.id,
+            "is_completed": False
+        })
+
+        if len(rows) >= chunk_size:
+            await flush()
+            yield report
+
+    if rows:
+        await flush()
+        yield report
+
+
+async def _stream_progress(
+    owner: User,
+    lines: AsyncIterator[tuple[int, str]],
+    import_format: str
+) -> AsyncIterator[bytes]:
+    """
+    Run an import, encoding its progress as NDJSON records
+
+    The import runs in its own session, as the response outlives the
+    endpoint. A failure after the response has started is reported as an
+    error record; chunks reported before it are kept.
+    """
+    report = new_report()
+    try:
+        async with AsyncSessionLocal() as db:
+            async for _ in import_chunks(db, owner, lines, import_format, report):
+                record = {"type": "progress", **{name: report[name] for name in PROGRESS_FIELDS}}
+                yield (json.dumps(record) + "\n").encode()
+    except Exception as e:
+        logger.error(f"Import for user {owner.username} failed: {e}", exc_info=True)
+        record = {"type": "error", **{name: report[name] for name in PROGRESS_FIELDS}}
+        yield (json.dumps({**record, "detail": "Import failed"}) + "\n").encode()
+        return
+
+    logger.info(
+        f"Todo import finished for user {owner.username}: "
+        f"{report['imported']} imported, {report['failed']} failed in {report['chunks']} chunks"
+    )
+    yield (json.dumps({"type": "report", **report}) + "\n").encode()
+
+
+class ImportProgressResponse(StreamingResponse):
+    """
+    Streaming response that reads the request body while it is sent
+
+    StreamingResponse listens for a disconnect by reading the receive
+    channel, which would swallow the body chunks the import is still
+    reading; here a disconnect surfaces from the body stream instead.
+    """
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+
+
+def import_progress_response(
+    owner: User,
+    lines: AsyncIterator[tuple[int, str]],
+    import_format: str
+) -> ImportProgressResponse:
+    """
+    Build a response that runs an import and streams its progress
+
+    One {"type": "progress", ...} line with the running counts is sent as
+    each chunk commits, then one {"type": "report", ...} line with the full
+    import report, or a {"type": "error", ...} line if the import failed.
+
+    Args:
+        owner: User who will own the imported todos
+        lines: Numbered input lines, e.g. from iter_lines
+        import_format: "ndjson" or "csv"
+
+    Returns:
+        NDJSON streaming response
+    """
+    return ImportProgressResponse(_stream_progress(owner, lines, import_format))
@@ -0,0 +1,91 @@
+import atexit
+import json
+import logging
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+from config import get_settings
+
+settings = get_settings()
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Logger for the one-record-per-request access log in JSON mode
+access_logger = logging.getLogger("access")
+
+_listener: Optional[QueueListener] = None
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Format records as single-line JSON objects
+
+    Structured fields passed as ``extra={"fields": {...}}`` are merged into
+    the top level of the object.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _StructuredQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args now, since they may be mutated once the call returns,
+        # but keep exc_info and fields for the JSON formatter
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def configure_logging() -> None:
+    """
+    Configure root logging according to LOG_FORMAT
+
+    In "text" mode records are written synchronously in the classic one
+    line format. In "json" mode the calling thread only enqueues records;
+    a QueueListener thread formats them as JSON lines and writes them, so
+    log I/O never blocks the event loop. Safe to call more than once.
+    """
+    global _listener
+
+    if settings.LOG_FORMAT != "json":
+        logging.basicConfig(level=settings.LOG_LEVEL, format=TEXT_FORMAT)
+        return
+
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(JSONFormatter())
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    _listener = QueueListener(records, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+    root = logging.getLogger()
+    root.handlers = [_StructuredQueueHandler(records)]
+    root.setLevel(settings.LOG_LEVEL)
+    # Sampled access records are always emitted once they are created
+    access_logger.setLevel(logging.INFO)
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread"""
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
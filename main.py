@@ -1,22 +1,51 @@
 from fastapi import FastAPI, Request, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, contextmanager, suppress
 from sqlalchemy import select
 from database import init_db, get_db
-from models import User, UserRole
-from auth import get_password_hash
+from models import User, UserRole, TodoCounter
+from auth import PasswordHasherBusy, shutdown_password_hasher
 from config import get_settings
-from middleware import LoggingMiddleware, SecurityHeadersMiddleware, limiter
+from middleware import (
+    LoggingMiddleware, SecurityHeadersMiddleware, MetricsMiddleware, QueryTimingMiddleware,
+    RateLimitMiddleware, AdmissionControlMiddleware
+)
+from metrics import registry, Gauge, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from pagination import NEXT_CURSOR_HEADER
 from routers import auth, todos, admin
-from slowapi import _rate_limit_exceeded_handler
-from slowapi.errors import RateLimitExceeded
+from stats import system_stats
+from write_queue import write_queue
+import asyncio
+import ipaddress
 import logging
+import secrets
+import time
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# bcrypt hash of the default admin password "admin123", so bootstrapping
+# the first admin does not spend a hash on startup
+DEFAULT_ADMIN_PASSWORD_HASH = "$2b$12$h55Hi/WFmf9bj8gsKS2nIuFT6OYM6ZWdksahLsdppNETsVLyvSoUO"
+
+startup_phase_seconds = registry.register(Gauge(
+    "startup_phase_seconds",
+    "Time spent in each phase of the last application startup",
+    ("phase",)
+))
+
+
+@contextmanager
+def startup_phase(timings: dict, name: str):
+    """Record the wall time of a startup phase"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = time.perf_counter() - start
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -25,20 +54,48 @@ async def lifespan(app: FastAPI):
     """
     # Startup
     logger.info("Starting up application...")
+    timings = {}
     
     # Initialize database
-    await init_db()
-    logger.info("Database initialized")
+    with startup_phase(timings, "init_db"):
+        schema_changed = await init_db(force=not settings.FAST_STARTUP)
+    logger.info(
+        "Database schema updated" if schema_changed else "Database schema is current"
+    )
     
     # Create default admin user if not exists
-    await create_default_admin()
+    with startup_phase(timings, "default_admin"):
+        await create_default_admin()
     
-    logger.info("Application startup complete")
+    with startup_phase(timings, "background_tasks"):
+        # Keep the admin system overview snapshot warm
+        stats_refresher = None
+        if settings.ADMIN_STATS_REFRESH_SECONDS > 0:
+            stats_refresher = asyncio.create_task(system_stats.run_refresher())
+        
+        # Group commit single-todo writes
+        if settings.WRITE_QUEUE_ENABLED:
+            write_queue.start()
+    
+    for phase, seconds in timings.items():
+        startup_phase_seconds.set(seconds, phase)
+    logger.info(
+        "Application startup complete in "
+        f"{sum(timings.values()) * 1000:.1f}ms ("
+        + ", ".join(f"{phase}={seconds * 1000:.1f}ms" for phase, seconds in timings.items())
+        + ")"
+    )
     
     yield
     
     # Shutdown
     logger.info("Shutting down application...")
+    if stats_refresher is not None:
+        stats_refresher.cancel()
+        with suppress(asyncio.CancelledError):
+            await stats_refresher
+    await write_queue.stop()
+    shutdown_password_hasher()
 
 
 async def create_default_admin():
@@ -48,21 +105,21 @@ async def create_default_admin():
     async for db in get_db():
         try:
             # Check if any admin exists
-            result = await db.execute(
-                select(User).where(User.role == UserRole.ADMIN)
+            admin_id = await db.scalar(
+                select(User.id).where(User.role == UserRole.ADMIN).limit(1)
             )
-            admin = result.scalar_one_or_none()
             
-            if not admin:
+            if admin_id is None:
                 # Create default admin
                 default_admin = User(
                     email="admin@example.com",
                     username="admin",
                     full_name="System Administrator",
-                    hashed_password=get_password_hash("admin123"),
+                    hashed_password=DEFAULT_ADMIN_PASSWORD_HASH,
                     role=UserRole.ADMIN,
                     is_active=True,
-                    is_verified=True
+                    is_verified=True,
+                    todo_counter=TodoCounter()
                 )
                 
                 db.add(default_admin)
@@ -120,25 +177,29 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
-# Add rate limiter state
-app.state.limiter = limiter
-
-# Add rate limit exceeded handler
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+# Add custom middleware
+if settings.ADMISSION_CONTROL_ENABLED:
+    app.add_middleware(AdmissionControlMiddleware)
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+app.add_middleware(SecurityHeadersMiddleware)
+app.add_middleware(LoggingMiddleware)
+app.add_middleware(QueryTimingMiddleware)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
-# Add CORS middleware
+# Add CORS middleware last so it wraps everything else: preflights are
+# answered before rate limiting and admission control, and their 429 and
+# 503 responses still carry CORS headers
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # In production, specify actual origins
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Server-Timing"],
 )
 
-# Add custom middleware
-app.add_middleware(SecurityHeadersMiddleware)
-app.add_middleware(LoggingMiddleware)
-
 
 # Exception handlers
 @app.exception_handler(RequestValidationError)
@@ -163,6 +224,18 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     )
 
 
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    """
+    Reject requests quickly when the password hashing pool is saturated
+    """
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Authentication service is busy, please retry"},
+        headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER_SECONDS)}
+    )
+
+
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
     """
@@ -187,7 +260,6 @@ app.include_router(admin.router)
 
 # Root endpoint
 @app.get("/", tags=["Root"])
-@limiter.limit("10/minute")
 async def root(request: Request):
     """
     Root endpoint with API information
@@ -217,6 +289,41 @@ async def health_check():
     }
 
 
+def metrics_allowed(request: Request) -> bool:
+    """
+    Check a request may scrape metrics
+    
+    With METRICS_TOKEN set the scraper must present it as a bearer token;
+    otherwise only loopback clients are allowed. The nginx proxy also
+    refuses /api/metrics, since proxied requests arrive from loopback.
+    """
+    if settings.METRICS_TOKEN:
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        return scheme.lower() == "bearer" and secrets.compare_digest(
+            token.encode(), settings.METRICS_TOKEN.encode()
+        )
+    
+    client = request.client.host if request.client else ""
+    try:
+        return ipaddress.ip_address(client).is_loopback
+    except ValueError:
+        return False
+
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", tags=["Health"], include_in_schema=False)
+    async def metrics(request: Request):
+        """
+        Prometheus metrics for this worker process
+        """
+        if not metrics_allowed(request):
+            return JSONResponse(
+                status_code=status.HTTP_403_FORBIDDEN,
+                content={"detail": "Not authorized to read metrics"}
+            )
+        return Response(registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
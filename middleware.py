@@ -1,99 +1,418 @@
+import math
 import time
+import random
 import logging
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from auth import verify_access_token
+from config import get_settings
+from logging_config import configure_logging, access_logger
+from database import track_queries, current_query_stats
+from ratelimit import create_rate_limiters
+from admission import limiters, route_class, admission_rejected_total
+import metrics
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+configure_logging()
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 
-class LoggingMiddleware(BaseHTTPMiddleware):
+class LoggingMiddleware:
     """
-    Middleware for logging HTTP requests and responses
+    ASGI middleware for logging HTTP requests and responses
+    
+    The response is logged and X-Process-Time added when the response
+    headers are sent, so streaming bodies pass through untouched.
+    
+    With LOG_FORMAT=json a single structured access record is written per
+    request once the response has finished instead, and only a sample of
+    successful requests (ACCESS_LOG_SAMPLE_RATE) is kept.
     """
     
-    async def dispatch(self, request: Request, call_next):
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.structured = settings.LOG_FORMAT == "json"
+        self.sample_rate = settings.ACCESS_LOG_SAMPLE_RATE
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
         """
         Process each request and log details
         
         Args:
-            request: Incoming HTTP request
-            call_next: Next middleware/endpoint in chain
-            
-        Returns:
-            HTTP response
+            scope: ASGI connection scope
+            receive: ASGI receive channel
+            send: ASGI send channel
         """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        if self.structured:
+            await self._call_structured(scope, receive, send)
+            return
+        
         # Start timer
         start_time = time.time()
+        method = scope["method"]
+        path = scope.get("root_path", "") + scope["path"]
+        client = scope.get("client")
         
         # Log request
         logger.info(
-            f"Request: {request.method} {request.url.path} "
-            f"- Client: {request.client.host if request.client else 'unknown'}"
+            f"Request: {method} {path} "
+            f"- Client: {client[0] if client else 'unknown'}"
         )
         
+        async def send_with_timing(message: Message):
+            if message["type"] == "http.response.start":
+                # Calculate processing time
+                process_time = time.time() - start_time
+                
+                # Log response
+                queries = current_query_stats()
+                logger.info(
+                    f"Response: {method} {path} "
+                    f"- Status: {message['status']} "
+                    f"- Time: {process_time:.3f}s"
+                    + (
+                        f" - Queries: {queries.count} ({queries.duration:.3f}s)"
+                        if queries is not None else ""
+                    )
+                )
+                
+                # Add custom header with processing time
+                MutableHeaders(scope=message)["X-Process-Time"] = str(process_time)
+            
+            await send(message)
+        
         # Process request
         try:
-            response = await call_next(request)
-            
-            # Calculate processing time
-            process_time = time.time() - start_time
-            
-            # Log response
-            logger.info(
-                f"Response: {request.method} {request.url.path} "
-                f"- Status: {response.status_code} "
-                f"- Time: {process_time:.3f}s"
-            )
-            
-            # Add custom header with processing time
-            response.headers["X-Process-Time"] = str(process_time)
-            
-            return response
-            
+            await self.app(scope, receive, send_with_timing)
         except Exception as e:
             # Log error
             process_time = time.time() - start_time
             logger.error(
-                f"Error: {request.method} {request.url.path} "
+                f"Error: {method} {path} "
                 f"- Exception: {str(e)} "
                 f"- Time: {process_time:.3f}s"
             )
             raise
+    
+    async def _call_structured(self, scope: Scope, receive: Receive, send: Send):
+        """Handle a request, then write one combined JSON access record"""
+        start_time = time.time()
+        state = {"status": None, "bytes": 0}
+        
+        async def send_with_timing(message: Message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                MutableHeaders(scope=message)["X-Process-Time"] = str(time.time() - start_time)
+            elif message["type"] == "http.response.body":
+                state["bytes"] += len(message.get("body", b""))
+            
+            await send(message)
+        
+        error = None
+        try:
+            await self.app(scope, receive, send_with_timing)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            status = state["status"]
+            failed = error is not None or status is None or status >= 400
+            
+            # Decide before building the record so dropped requests cost nothing
+            if failed or random.random() < self.sample_rate:
+                client = scope.get("client")
+                fields = {
+                    "method": scope["method"],
+                    "path": scope.get("root_path", "") + scope["path"],
+                    "status": status if status is not None else 500,
+                    "duration_ms": round((time.time() - start_time) * 1000, 3),
+                    "bytes": state["bytes"],
+                    "client": client[0] if client else None,
+                }
+                queries = current_query_stats()
+                if queries is not None:
+                    fields["db_queries"] = queries.count
+                    fields["db_ms"] = round(queries.duration * 1000, 3)
+                if not failed:
+                    fields["sample_rate"] = self.sample_rate
+                if error is not None:
+                    fields["error"] = str(error)
+                
+                access_logger.log(
+                    logging.ERROR if error is not None else logging.INFO,
+                    "request",
+                    extra={"fields": fields}
+                )
 
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
+class QueryTimingMiddleware:
     """
-    Middleware for adding security headers to responses
+    ASGI middleware counting and timing the SQL statements of each request
+    
+    The totals are sent in a Server-Timing header and included in the
+    request log. In DEBUG mode a warning is logged for every statement
+    shape run more than QUERY_REPEAT_WARN_THRESHOLD times in one request,
+    which usually points at an N+1 query pattern.
     """
     
-    async def dispatch(self, request: Request, call_next):
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.repeat_threshold = (
+            settings.QUERY_REPEAT_WARN_THRESHOLD if settings.DEBUG else 0
+        )
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
         """
-        Add security headers to response
+        Track statements for one request
         
         Args:
-            request: Incoming HTTP request
-            call_next: Next middleware/endpoint in chain
+            scope: ASGI connection scope
+            receive: ASGI receive channel
+            send: ASGI send channel
+        """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        stats = track_queries(track_shapes=self.repeat_threshold > 0)
+        
+        async def send_with_timing(message: Message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append(
+                    "Server-Timing",
+                    f'db;dur={stats.duration * 1000:.3f};desc="{stats.count} queries"'
+                )
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            if stats.shapes:
+                self._warn_repeats(scope, stats)
+    
+    def _warn_repeats(self, scope: Scope, stats) -> None:
+        for shape, count in stats.shapes.items():
+            if count > self.repeat_threshold:
+                logger.warning(
+                    f"Possible N+1: {scope['method']} {scope['path']} ran the same "
+                    f"statement {count} times: {shape[:200]}"
+                )
+
+
+class SecurityHeadersMiddleware:
+    """
+    ASGI middleware for adding security headers to responses
+    """
+    
+    # Security headers added to every HTTP response
+    HEADERS = {
+        "X-Content-Type-Options": "nosniff",
+        "X-Frame-Options": "DENY",
+        "X-XSS-Protection": "1; mode=block",
+        "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
+    }
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        """
+        Add security headers to the response start message
+        
+        Args:
+            scope: ASGI connection scope
+            receive: ASGI receive channel
+            send: ASGI send channel
+        """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                for name, value in self.HEADERS.items():
+                    headers[name] = value
             
-        Returns:
-            HTTP response with security headers
+            await send(message)
+        
+        await self.app(scope, receive, send_with_headers)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request counts, latency and in-flight requests
+    
+    Requests are labelled by route template (e.g. /todos/{todo_id}) rather
+    than raw path, so label cardinality stays bounded; requests that match
+    no route are labelled "unmatched".
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        """
+        Record metrics for one request
+        
+        Args:
+            scope: ASGI connection scope
+            receive: ASGI receive channel
+            send: ASGI send channel
+        """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        start_time = time.perf_counter()
+        method = scope["method"]
+        status_code = 500
+        
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+        
+        metrics.http_requests_in_flight.inc(method)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.http_requests_in_flight.dec(method)
+            
+            # The router stores the matched route in the shared scope
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            
+            metrics.http_requests_total.inc(method, path, str(status_code))
+            metrics.http_request_duration_seconds.observe(
+                time.perf_counter() - start_time, method, path
+            )
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware applying token bucket rate limits
+    
+    Requests with a valid bearer token are charged to the user's buckets,
+    so users behind one NAT do not share a limit; other requests are
+    charged to the client IP. Every request takes a token from the global
+    RATE_LIMIT_GLOBAL budget, and routes listed in RATE_LIMIT_ROUTE_COSTS
+    also take their cost from the strict RATE_LIMIT_PER_MINUTE budget.
+    Rejected requests get 429 with a Retry-After header.
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.limiters = create_rate_limiters()
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        """
+        Charge the request to its client's buckets or reject it
+        
+        Args:
+            scope: ASGI connection scope
+            receive: ASGI receive channel
+            send: ASGI send channel
         """
-        response = await call_next(request)
+        # CORS preflights are answered further out; never charge OPTIONS
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        
+        client_key = None
+        for limiter in self.limiters:
+            cost = limiter.cost(scope["method"], scope["path"])
+            if cost <= 0:
+                continue
+            if client_key is None:
+                client_key = self._client_key(scope)
+            
+            retry_after = await limiter.take(client_key, cost)
+            if retry_after > 0:
+                response = JSONResponse(
+                    {"detail": "Rate limit exceeded, please retry later"},
+                    status_code=429,
+                    headers={"Retry-After": str(math.ceil(retry_after))}
+                )
+                await response(scope, receive, send)
+                return
         
-        # Add security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+        await self.app(scope, receive, send)
+    
+    @staticmethod
+    def _client_key(scope: Scope) -> str:
+        scheme, _, token = Headers(scope=scope).get("authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and token:
+            token_data = verify_access_token(token)
+            if token_data is not None:
+                return f"user:{token_data.user_id}"
         
-        return response
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
 
 
-# Rate limiter instance
-limiter = Limiter(key_func=get_remote_address)
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware bounding the requests handled at once per route class
+    
+    Requests are classed as auth, admin, export, read or write and each
+    class has its own concurrency limit and wait queue (see admission.py).
+    A slot is held until the response is complete. Requests
+    that cannot be admitted in time are answered at once with 503 and
+    Retry-After instead of piling up behind a slow database.
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.retry_after = str(settings.ADMISSION_RETRY_AFTER_SECONDS)
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        """
+        Admit, queue or reject one request
+        
+        Args:
+            scope: ASGI connection scope
+            receive: ASGI receive channel
+            send: ASGI send channel
+        """
+        name = route_class(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        limiter = limiters.get(name)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+        
+        rejected = await limiter.acquire()
+        if rejected is not None:
+            admission_rejected_total.inc(name, rejected)
+            response = JSONResponse(
+                {"detail": "Service is busy, please retry"},
+                status_code=503,
+                headers={"Retry-After": self.retry_after}
+            )
+            await response(scope, receive, send)
+            return
+        
+        start_time = time.perf_counter()
+        latency = None
+        
+        async def send_with_latency(message: Message):
+            nonlocal latency
+            if message["type"] == "http.response.start":
+                # Time to the response start, so long streaming bodies do
+                # not read as slow requests when adapting the limit
+                latency = time.perf_counter() - start_time
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_latency)
+        finally:
+            if latency is None:
+                latency = time.perf_counter() - start_time
+            limiter.release(latency)
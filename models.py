@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index, Enum as SQLEnum
+from sqlalchemy.dialects import sqlite, postgresql  # noqa: F401 (registers full text functions)
+from sqlalchemy.sql.expression import literal_column
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -18,6 +20,37 @@ class TodoPriority(str, enum.Enum):
     HIGH = "high"
 
 
+# SQLite stores server-side timestamps as "YYYY-MM-DD HH:MM:SS" text. Bind
+# client-side values in the same format so keyset comparisons on sortable
+# timestamps are not thrown off by a trailing ".000000".
+SortableDateTime = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d "
+                       "%(hour)02d:%(minute)02d:%(second)02d"
+    ),
+    "sqlite"
+)
+
+
+def todo_search_vector(title, description):
+    """
+    Postgres full text document for a todo, title ranked above description
+    
+    The GIN index and search queries must build the identical expression,
+    and all constants are inlined rather than bound so the planner can match
+    the index under prepared statements.
+    """
+    config = literal_column("'english'::regconfig")
+    empty = literal_column("''")
+    return func.setweight(
+        func.to_tsvector(config, func.coalesce(title, empty)), literal_column("'A'")
+    ).op("||")(
+        func.setweight(
+            func.to_tsvector(config, func.coalesce(description, empty)), literal_column("'B'")
+        )
+    )
+
+
 class User(Base):
     """User model for authentication and authorization"""
     __tablename__ = "users"
@@ -35,6 +68,9 @@ class User(Base):
     
     # Relationship
     todos = relationship("Todo", back_populates="owner", cascade="all, delete-orphan")
+    todo_counter = relationship(
+        "TodoCounter", uselist=False, cascade="all, delete-orphan"
+    )
     
     def __repr__(self):
         return f"<User(id={self.id}, username={self.username}, role={self.role})>"
@@ -50,12 +86,56 @@ class Todo(Base):
     is_completed = Column(Boolean, default=False, nullable=False)
     priority = Column(SQLEnum(TodoPriority), default=TodoPriority.MEDIUM, nullable=False)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(SortableDateTime, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     completed_at = Column(DateTime(timezone=True), nullable=True)
     
     # Relationship
     owner = relationship("User", back_populates="todos")
     
+    # Keyset pagination indexes, one per supported filter combination
+    __table_args__ = (
+        Index("ix_todos_owner_created", "owner_id", "created_at", "id"),
+        Index("ix_todos_owner_completed_created", "owner_id", "is_completed", "created_at", "id"),
+        Index("ix_todos_owner_priority_created", "owner_id", "priority", "created_at", "id"),
+        Index(
+            "ix_todos_owner_completed_priority_created",
+            "owner_id", "is_completed", "priority", "created_at", "id"
+        ),
+        Index("ix_todos_created", "created_at", "id"),
+        Index("ix_todos_completed_created", "is_completed", "created_at", "id"),
+        # Full text search; SQLite uses the todos_fts table instead
+        Index(
+            "ix_todos_search",
+            todo_search_vector(title, description),
+            postgresql_using="gin"
+        ).ddl_if(dialect="postgresql"),
+    )
+    
     def __repr__(self):
         return f"<Todo(id={self.id}, title={self.title}, completed={self.is_completed})>"
+
+
+class TodoCounter(Base):
+    """Per-user todo counters, kept in step with every todo write"""
+    __tablename__ = "todo_counters"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total = Column(Integer, default=0, nullable=False)
+    completed = Column(Integer, default=0, nullable=False)
+    priority_low = Column(Integer, default=0, nullable=False)
+    priority_medium = Column(Integer, default=0, nullable=False)
+    priority_high = Column(Integer, default=0, nullable=False)
+    # Bumped on every write to the user's todos; used for ETags
+    version = Column(Integer, default=0, server_default="0", nullable=False)
+    
+    def by_priority(self) -> dict:
+        """Get counts keyed by priority"""
+        return {
+            TodoPriority.LOW: self.priority_low,
+            TodoPriority.MEDIUM: self.priority_medium,
+            TodoPriority.HIGH: self.priority_high
+        }
+    
+    def __repr__(self):
+        return f"<TodoCounter(user_id={self.user_id}, total={self.total}, completed={self.completed})>"
@@ -0,0 +1,106 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Sequence
+from fastapi import HTTPException, Response, status
+from sqlalchemy import Select, tuple_
+from sqlalchemy.sql.elements import ColumnElement
+from models import Todo
+
+# Response header carrying the cursor for the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(todo: Todo) -> Optional[str]:
+    """
+    Encode an opaque keyset cursor pointing after the given todo
+
+    Args:
+        todo: Last todo of the current page
+
+    Returns:
+        URL-safe cursor string, or None if the todo has no creation time
+    """
+    if todo.created_at is None:
+        return None
+
+    payload = json.dumps([todo.created_at.isoformat(), todo.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Decode a keyset cursor
+
+    Args:
+        cursor: Cursor produced by encode_cursor
+
+    Returns:
+        Tuple of (created_at, id)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, todo_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(todo_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def todos_after_cursor(cursor: str) -> ColumnElement[bool]:
+    """
+    Build the keyset predicate for todos ordered by (created_at, id) descending
+
+    Args:
+        cursor: Cursor produced by encode_cursor
+
+    Returns:
+        SQL predicate selecting rows after the cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    created_at, todo_id = decode_cursor(cursor)
+    return tuple_(Todo.created_at, Todo.id) < (created_at, todo_id)
+
+
+def apply_pagination(query: Select, cursor: Optional[str], skip: int, limit: int) -> Select:
+    """
+    Order a todo query newest first and apply cursor or offset pagination
+
+    Args:
+        query: Todo select statement
+        cursor: Keyset cursor; takes precedence over skip when given
+        skip: Number of rows to skip when no cursor is given
+        limit: Maximum number of rows to return
+
+    Returns:
+        Paginated select statement
+
+    Raises:
+        HTTPException: If the cursor is malformed
+    """
+    query = query.order_by(Todo.created_at.desc(), Todo.id.desc())
+
+    if cursor:
+        try:
+            query = query.where(todos_after_cursor(cursor))
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid pagination cursor"
+            )
+    else:
+        query = query.offset(skip)
+
+    return query.limit(limit)
+
+
+def set_next_cursor(response: Response, todos: Sequence[Todo], limit: int) -> None:
+    """Set the next page cursor header when the page is full"""
+    if todos and len(todos) == limit:
+        next_cursor = encode_cursor(todos[-1])
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
@@ -0,0 +1,254 @@
+import asyncio
+import multiprocessing
+import os
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+from config import get_settings
+import logging
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_rate(rate: str) -> Tuple[int, float]:
+    """
+    Parse a rate such as "60/minute"
+
+    Args:
+        rate: Request count and period (second, minute, hour or day)
+
+    Returns:
+        Tuple of the count and the period in seconds
+
+    Raises:
+        ValueError: If the rate is not in that form
+    """
+    match = re.fullmatch(r"\s*(\d+)\s*/\s*(second|minute|hour|day)s?\s*", rate)
+    if match is None:
+        raise ValueError(f"Invalid rate limit: {rate!r}")
+    return int(match.group(1)), float(_PERIODS[match.group(2)])
+
+
+class MemoryBucketStore:
+    """
+    Token buckets held in this worker process
+
+    Each key keeps two numbers. Buckets are kept in order of last update,
+    so the ones idle long enough to have refilled completely, which are
+    indistinguishable from new ones, are evicted from the front in O(1).
+    """
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.idle_after = capacity / rate
+        # Key -> [tokens, last update]
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+
+    async def take(self, key: str, cost: float) -> float:
+        now = time.monotonic()
+        self._evict(now)
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            tokens = self.capacity
+        else:
+            tokens = min(self.capacity, bucket[0] + (now - bucket[1]) * self.rate)
+
+        if tokens < cost:
+            return (cost - tokens) / self.rate
+
+        self._buckets[key] = [tokens - cost, now]
+        self._buckets.move_to_end(key)
+        return 0.0
+
+    def _evict(self, now: float) -> None:
+        buckets = self._buckets
+        while buckets:
+            key, (_, updated) = next(iter(buckets.items()))
+            if now - updated < self.idle_after:
+                break
+            del buckets[key]
+
+
+class SQLiteBucketStore:
+    """
+    Token buckets in a local SQLite file shared by every worker on the host
+
+    Taking tokens is a single UPSERT ... RETURNING, so concurrent workers
+    never lose updates. The database holds only rate limit state, so it
+    runs without fsync. Statements run on a dedicated thread, so a worker
+    waiting for another's lock keeps serving requests in the meantime.
+    Fully refilled buckets are deleted periodically. If the file is locked
+    for longer than the busy timeout the request is allowed rather than
+    failed.
+    """
+
+    EVICT_INTERVAL_SECONDS = 60.0
+
+    def __init__(self, path: str, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.idle_after = capacity / rate
+        self._next_eviction = 0.0
+        # One thread, so the connection is only ever used by one at a time
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ratelimit")
+
+        self._connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=OFF")
+        self._connection.execute("PRAGMA busy_timeout=100")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+
+    async def take(self, key: str, cost: float) -> float:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._take, key, cost
+        )
+
+    def _take(self, key: str, cost: float) -> float:
+        # Wall clock time, since it is compared across processes
+        now = time.time()
+        params = {"key": key, "cost": cost, "now": now, "capacity": self.capacity, "rate": self.rate}
+
+        try:
+            if now >= self._next_eviction:
+                self._next_eviction = now + self.EVICT_INTERVAL_SECONDS
+                self._connection.execute(
+                    "DELETE FROM rate_limit_buckets WHERE updated < ?",
+                    (now - self.idle_after,)
+                )
+
+            # No row comes back when the existing bucket is short of tokens
+            taken = self._connection.execute(
+                """
+                INSERT INTO rate_limit_buckets (key, tokens, updated)
+                VALUES (:key, :capacity - :cost, :now)
+                ON CONFLICT (key) DO UPDATE SET
+                    tokens = min(:capacity, tokens + (:now - updated) * :rate) - :cost,
+                    updated = :now
+                WHERE min(:capacity, tokens + (:now - updated) * :rate) >= :cost
+                RETURNING tokens
+                """,
+                params
+            ).fetchone()
+            if taken is not None:
+                return 0.0
+
+            row = self._connection.execute(
+                "SELECT tokens, updated FROM rate_limit_buckets WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Rate limit store unavailable, allowing request: {e}")
+            return 0.0
+
+        if row is None:
+            return 0.0
+        tokens = min(self.capacity, row[0] + (now - row[1]) * self.rate)
+        return max(cost - tokens, 0.0) / self.rate
+
+
+class RateLimiter:
+    """
+    Token bucket rate limiter with per-route costs
+
+    Every client key has a bucket of ``capacity`` tokens refilling evenly
+    over ``period`` seconds. A request takes the cost of its route, looked
+    up by "METHOD /path", or ``default_cost``; routes costing 0 are never
+    limited. Keys are prefixed with ``name``, so limiters can share a store.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        store,
+        route_costs: Dict[str, float],
+        default_cost: float = 1
+    ):
+        self.name = name
+        self.store = store
+        self.default_cost = default_cost
+        # A cost above the capacity could never be paid
+        self.route_costs = {
+            route: min(cost, store.capacity) for route, cost in route_costs.items()
+        }
+
+    def cost(self, method: str, path: str) -> float:
+        return self.route_costs.get(f"{method} {path}", self.default_cost)
+
+    async def take(self, key: str, cost: float) -> float:
+        """
+        Take tokens from a client's bucket
+
+        Args:
+            key: Client key
+            cost: Tokens the request costs
+
+        Returns:
+            0 if the request is allowed, otherwise seconds until it would be
+        """
+        return await self.store.take(f"{self.name}:{key}", cost)
+
+
+def rate_limit_backend() -> str:
+    """
+    Bucket store to use, resolving RATE_LIMIT_BACKEND="auto"
+
+    Buckets in memory are per worker, so each of N workers would grant the
+    full limit; "auto" shares them through SQLite whenever this process is
+    one of several workers: WEB_CONCURRENCY (read by uvicorn and gunicorn)
+    above 1, or a child process started by uvicorn --workers.
+    """
+    backend = settings.RATE_LIMIT_BACKEND
+    if backend != "auto":
+        return backend
+    try:
+        workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+    except ValueError:
+        workers = 1
+    if workers > 1 or multiprocessing.parent_process() is not None:
+        return "sqlite"
+    return "memory"
+
+
+def _create_store(backend: str, limit: str):
+    capacity, period = parse_rate(limit)
+    rate = capacity / period
+
+    if backend == "sqlite":
+        return SQLiteBucketStore(settings.RATE_LIMIT_SQLITE_PATH, capacity, rate)
+    if backend == "memory":
+        return MemoryBucketStore(capacity, rate)
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {backend!r}")
+
+
+def create_rate_limiters() -> List[RateLimiter]:
+    """
+    Build the rate limiters configured by settings, in the order to apply them
+
+    The route limiter charges only the routes in RATE_LIMIT_ROUTE_COSTS to
+    the strict RATE_LIMIT_PER_MINUTE budget; the global limiter charges
+    every other route one token of the RATE_LIMIT_GLOBAL budget.
+    """
+    backend = rate_limit_backend()
+    route_limiter = RateLimiter(
+        "route",
+        _create_store(backend, settings.RATE_LIMIT_PER_MINUTE),
+        settings.RATE_LIMIT_ROUTE_COSTS,
+        default_cost=0
+    )
+    global_limiter = RateLimiter(
+        "global",
+        _create_store(backend, settings.RATE_LIMIT_GLOBAL),
+        {route: 0 for route in settings.RATE_LIMIT_EXEMPT_ROUTES}
+    )
+    return [route_limiter, global_limiter]
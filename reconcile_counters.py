@@ -0,0 +1,41 @@
+"""
+Rebuild per-user todo counters from the todos table and report drift
+
+Usage:
+    python reconcile_counters.py            # report and fix drift
+    python reconcile_counters.py --dry-run  # only report drift
+"""
+import argparse
+import asyncio
+import sys
+from database import AsyncSessionLocal, init_db
+from counters import reconcile_todo_counters
+
+
+async def main(dry_run: bool) -> int:
+    await init_db()
+
+    async with AsyncSessionLocal() as db:
+        drift = await reconcile_todo_counters(db, fix=not dry_run)
+
+    for record in drift:
+        print(
+            f"user {record['user_id']}: "
+            f"stored={record['stored']} actual={record['actual']}"
+        )
+
+    action = "found" if dry_run else "fixed"
+    print(f"{len(drift)} drifted counter rows {action}")
+
+    return 1 if drift and dry_run else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconcile per-user todo counters")
+    parser.add_argument(
+        "--dry-run", action="store_true",
+        help="Report drift without writing; exit with status 1 if any is found"
+    )
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(main(args.dry_run)))
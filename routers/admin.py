@@ -1,14 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
-from database import get_db
-from models import User, Todo, UserRole
+from sqlalchemy import select, update, delete
+from database import get_db, get_read_db
+from models import User, Todo, TodoCounter, UserRole
 from schemas import (
     UserResponse, UserRoleUpdate, TodoWithOwner,
     MessageResponse
 )
+from pagination import apply_pagination, set_next_cursor
 from dependencies import require_admin
+from cache import principal_cache
+from stats import system_stats
+from export import export_query, export_response
+from serialization import (
+    todo_with_owner_list_adapter, todo_with_owner_list_query, with_owner, json_list_response
+)
 from typing import List
 import logging
 
@@ -24,7 +30,7 @@ async def get_all_users(
     role: str | None = Query(None, description="Filter by role (user, admin)"),
     is_active: bool | None = Query(None, description="Filter by active status"),
     current_admin: User = Depends(require_admin),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get all users (admin only)
@@ -69,7 +75,7 @@ async def get_all_users(
 async def get_user_details(
     user_id: int,
     current_admin: User = Depends(require_admin),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get detailed information about a specific user (admin only)
@@ -110,11 +116,22 @@ async def update_user_role(
     
     Requires admin privileges
     """
-    # Get user
-    result = await db.execute(
-        select(User).where(User.id == user_id)
+    # Prevent self-demotion
+    if user_id == current_admin.id and role_update.role != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot demote yourself from admin role"
+        )
+    
+    # Update and fetch the user in one statement
+    result = await db.scalars(
+        update(User)
+        .where(User.id == user_id)
+        .values(role=role_update.role)
+        .returning(User)
+        .execution_options(populate_existing=True)
     )
-    user = result.scalar_one_or_none()
+    user = result.one_or_none()
     
     if not user:
         raise HTTPException(
@@ -122,23 +139,12 @@ async def update_user_role(
             detail="User not found"
         )
     
-    # Prevent self-demotion
-    if user.id == current_admin.id and role_update.role != UserRole.ADMIN:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Cannot demote yourself from admin role"
-        )
-    
-    # Update role
-    old_role = user.role
-    user.role = role_update.role
-    
     await db.commit()
-    await db.refresh(user)
+    principal_cache.invalidate(user.id)
     
     logger.info(
-        f"Admin {current_admin.username} changed user {user.username} "
-        f"role from {old_role} to {role_update.role}"
+        f"Admin {current_admin.username} set user {user.username} "
+        f"role to {role_update.role}"
     )
     
     return user
@@ -157,11 +163,22 @@ async def toggle_user_active_status(
     
     Requires admin privileges
     """
-    # Get user
-    result = await db.execute(
-        select(User).where(User.id == user_id)
+    # Prevent self-deactivation
+    if user_id == current_admin.id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot deactivate your own account"
+        )
+    
+    # Toggle atomically in the database
+    result = await db.scalars(
+        update(User)
+        .where(User.id == user_id)
+        .values(is_active=~User.is_active)
+        .returning(User)
+        .execution_options(populate_existing=True)
     )
-    user = result.scalar_one_or_none()
+    user = result.one_or_none()
     
     if not user:
         raise HTTPException(
@@ -169,18 +186,8 @@ async def toggle_user_active_status(
             detail="User not found"
         )
     
-    # Prevent self-deactivation
-    if user.id == current_admin.id:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Cannot deactivate your own account"
-        )
-    
-    # Toggle active status
-    user.is_active = not user.is_active
-    
     await db.commit()
-    await db.refresh(user)
+    principal_cache.invalidate(user.id)
     
     logger.info(
         f"Admin {current_admin.username} set user {user.username} "
@@ -203,29 +210,30 @@ async def delete_user(
     
     Requires admin privileges
     """
-    # Get user
+    # Prevent self-deletion
+    if user_id == current_admin.id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot delete your own account"
+        )
+    
+    # Delete the user's rows, then the user, in one transaction
+    await db.execute(delete(Todo).where(Todo.owner_id == user_id))
+    await db.execute(delete(TodoCounter).where(TodoCounter.user_id == user_id))
     result = await db.execute(
-        select(User).where(User.id == user_id)
+        delete(User).where(User.id == user_id).returning(User.username)
     )
-    user = result.scalar_one_or_none()
+    username = result.scalar_one_or_none()
     
-    if not user:
+    if username is None:
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    # Prevent self-deletion
-    if user.id == current_admin.id:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Cannot delete your own account"
-        )
-    
-    # Delete user (todos will be cascade deleted)
-    username = user.username
-    await db.delete(user)
     await db.commit()
+    principal_cache.invalidate(user_id)
     
     logger.info(f"Admin {current_admin.username} deleted user {username}")
     
@@ -234,25 +242,31 @@ async def delete_user(
 
 @router.get("/todos", response_model=List[TodoWithOwner])
 async def get_all_todos(
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of items to skip"),
     limit: int = Query(10, ge=1, le=100, description="Number of items to return"),
+    cursor: str | None = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
     completed: bool | None = Query(None, description="Filter by completion status"),
     user_id: int | None = Query(None, description="Filter by user ID"),
     current_admin: User = Depends(require_admin),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get all todos from all users (admin only)
     
-    - **skip**: Number of items to skip (pagination)
+    - **skip**: Number of items to skip (offset pagination, ignored with cursor)
     - **limit**: Maximum number of items to return (1-100)
+    - **cursor**: Opaque cursor for keyset pagination (optional)
     - **completed**: Filter by completion status (optional)
     - **user_id**: Filter by user ID (optional)
     
+    When more items may follow, the cursor for the next page is returned
+    in the X-Next-Cursor response header.
+    
     Requires admin privileges
     """
-    # Build query with owner relationship
-    query = select(Todo).options(selectinload(Todo.owner))
+    # Build query over the response columns of each todo and its owner
+    query = todo_with_owner_list_query()
     
     # Apply filters
     if completed is not None:
@@ -262,74 +276,78 @@ async def get_all_todos(
         query = query.where(Todo.owner_id == user_id)
     
     # Apply ordering and pagination
-    query = query.order_by(Todo.created_at.desc()).offset(skip).limit(limit)
+    query = apply_pagination(query, cursor, skip, limit)
     
     # Execute query
     result = await db.execute(query)
-    todos = result.scalars().all()
+    rows = result.all()
+    
+    set_next_cursor(response, rows, limit)
     
     logger.info(f"Admin {current_admin.username} retrieved todos list")
     
-    return todos
+    return json_list_response(todo_with_owner_list_adapter, with_owner(rows), response)
 
 
-@router.get("/stats/overview")
-async def get_system_stats(
-    current_admin: User = Depends(require_admin),
-    db: AsyncSession = Depends(get_db)
+@router.get("/todos/export")
+async def export_all_todos(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Export format (ndjson, csv)"),
+    completed: bool | None = Query(None, description="Filter by completion status"),
+    user_id: int | None = Query(None, description="Filter by user ID"),
+    current_admin: User = Depends(require_admin)
 ):
     """
-    Get system-wide statistics (admin only)
+    Export todos from all users (admin only)
     
-    Returns counts of users, todos, and other metrics
+    - **format**: ndjson (one JSON object per line) or csv
+    - **completed**: Filter by completion status (optional)
+    - **user_id**: Filter by user ID (optional)
+    
+    Rows are streamed oldest first, so exports of any size use constant memory.
     
     Requires admin privileges
     """
-    # Get total users
-    total_users_result = await db.execute(select(func.count(User.id)))
-    total_users = total_users_result.scalar()
+    query = export_query()
     
-    # Get active users
-    active_users_result = await db.execute(
-        select(func.count(User.id)).where(User.is_active == True)
-    )
-    active_users = active_users_result.scalar()
+    if completed is not None:
+        query = query.where(Todo.is_completed == completed)
     
-    # Get verified users
-    verified_users_result = await db.execute(
-        select(func.count(User.id)).where(User.is_verified == True)
-    )
-    verified_users = verified_users_result.scalar()
+    if user_id is not None:
+        query = query.where(Todo.owner_id == user_id)
     
-    # Get total todos
-    total_todos_result = await db.execute(select(func.count(Todo.id)))
-    total_todos = total_todos_result.scalar()
+    logger.info(f"Admin {current_admin.username} started todo export ({format})")
     
-    # Get completed todos
-    completed_todos_result = await db.execute(
-        select(func.count(Todo.id)).where(Todo.is_completed == True)
-    )
-    completed_todos = completed_todos_result.scalar()
+    return export_response(query, format, "all-todos")
+
+
+@router.get("/stats/overview")
+async def get_system_stats(
+    current_admin: User = Depends(require_admin)
+):
+    """
+    Get system-wide statistics (admin only)
     
-    # Get users by role
-    role_result = await db.execute(
-        select(User.role, func.count(User.id))
-        .group_by(User.role)
-    )
-    users_by_role = {role.value: count for role, count in role_result.all()}
+    Returns counts of users, todos, and other metrics. Served from a
+    periodically refreshed snapshot; **generated_at** tells when it was taken.
+    
+    Requires admin privileges
+    """
+    stats = await system_stats.get()
     
     logger.info(f"Admin {current_admin.username} viewed system stats")
     
-    return {
-        "users": {
-            "total": total_users,
-            "active": active_users,
-            "verified": verified_users,
-            "by_role": users_by_role
-        },
-        "todos": {
-            "total": total_todos,
-            "completed": completed_todos,
-            "pending": total_todos - completed_todos
-        }
-    }
+    return stats
+
+
+@router.get("/stats/cache")
+async def get_cache_stats(
+    current_admin: User = Depends(require_admin)
+):
+    """
+    Get principal cache statistics for this worker process (admin only)
+    
+    Returns cache size and hit/miss counters
+    
+    Requires admin privileges
+    """
+    return {"principal": principal_cache.stats()}
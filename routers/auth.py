@@ -3,18 +3,19 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from database import get_db
-from models import User, UserRole
+from models import User, UserRole, TodoCounter
 from schemas import (
     UserCreate, UserResponse, Token, LoginRequest,
     RefreshTokenRequest, MessageResponse
 )
 from auth import (
-    verify_password, get_password_hash,
+    verify_password_async, get_password_hash_async,
     create_access_token, create_refresh_token,
     verify_token, create_email_verification_token,
     verify_email_token
 )
 from dependencies import get_current_user, get_current_active_user
+from cache import principal_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -56,7 +57,7 @@ async def register_user(
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     new_user = User(
         email=user_data.email,
         username=user_data.username,
@@ -64,7 +65,8 @@ async def register_user(
         hashed_password=hashed_password,
         role=UserRole.USER,
         is_active=True,
-        is_verified=False  # Require email verification
+        is_verified=False,  # Require email verification
+        todo_counter=TodoCounter()
     )
     
     db.add(new_user)
@@ -96,7 +98,7 @@ async def login(
     user = result.scalar_one_or_none()
     
     # Verify user and password
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -226,6 +228,7 @@ async def verify_email(
     # Mark user as verified
     user.is_verified = True
     await db.commit()
+    principal_cache.invalidate(user.id)
     
     logger.info(f"Email verified for user: {user.username}")
     
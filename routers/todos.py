@@ -1,16 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, insert, update, delete, case
 from sqlalchemy.orm import selectinload
-from database import get_db
+from database import get_db, get_read_db
 from models import Todo, User
 from schemas import (
     TodoCreate, TodoUpdate, TodoResponse,
+    TodoBatchCreate, TodoBatchUpdate, TodoBatchDelete,
+    TodoBatchItemResult, TodoBatchResponse, TodoImportReport,
     MessageResponse
 )
+from pagination import apply_pagination, set_next_cursor
 from dependencies import get_current_active_user
+from counters import adjust_todo_counters, get_todo_counters, lock_todo_counters
+from export import export_query, export_response
+from importer import import_todos, import_progress_response, iter_lines
+from search import search_query
+from write_queue import run_write
+from serialization import todo_list_adapter, todo_list_query, row_dicts, json_list_response
+from etag import make_etag, not_modified, set_etag, get_data_version, check_if_match
 from datetime import datetime
-from typing import List
+from typing import Iterable, List
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,6 +31,7 @@ router = APIRouter(prefix="/todos", tags=["Todos"])
 @router.post("/", response_model=TodoResponse, status_code=status.HTTP_201_CREATED)
 async def create_todo(
     todo_data: TodoCreate,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -33,45 +44,349 @@ async def create_todo(
     
     Requires authentication
     """
-    # Create new todo
-    new_todo = Todo(
-        title=todo_data.title,
-        description=todo_data.description,
-        priority=todo_data.priority,
-        owner_id=current_user.id,
-        is_completed=False
-    )
+    async def create(db: AsyncSession):
+        # Create new todo
+        new_todo = Todo(
+            title=todo_data.title,
+            description=todo_data.description,
+            priority=todo_data.priority,
+            owner_id=current_user.id,
+            is_completed=False
+        )
+        
+        db.add(new_todo)
+        version = await adjust_todo_counters(
+            db, current_user.id, total=1, by_priority={todo_data.priority: 1}
+        )
+        await db.flush()
+        await db.refresh(new_todo)
+        return new_todo, version
     
-    db.add(new_todo)
-    await db.commit()
-    await db.refresh(new_todo)
+    new_todo, version = await run_write(db, create)
+    
+    if version is not None:
+        set_etag(response, make_etag("todo", current_user.id, version, new_todo.id))
     
     logger.info(f"Todo created: {new_todo.id} by user {current_user.username}")
     
     return new_todo
 
 
+def _todo_changes(todo_data: TodoUpdate) -> dict:
+    """
+    Get the fields to change from a todo update
+    
+    Only description may be cleared; other null fields are left unchanged.
+    """
+    return {
+        field: value
+        for field, value in todo_data.model_dump(exclude_unset=True).items()
+        if value is not None or field == "description"
+    }
+
+
+def _todo_update_values(changes: dict) -> dict:
+    """
+    Build UPDATE values for todo changes, keeping completed_at in step
+    
+    completed_at is set when a todo becomes completed, kept when it already
+    was, and cleared when it is marked pending.
+    """
+    values = dict(changes)
+    
+    if changes.get("is_completed") is True:
+        values["completed_at"] = case(
+            (Todo.is_completed == False, datetime.utcnow()),
+            else_=Todo.completed_at
+        )
+    elif changes.get("is_completed") is False:
+        values["completed_at"] = None
+    
+    return values
+
+
+async def _raise_missing(db: AsyncSession, todo_id: int, action: str):
+    """
+    Raise 404 or 403 for a todo an owner-scoped statement did not match
+    
+    Args:
+        db: Database session
+        todo_id: ID of the todo
+        action: Verb for the error message ("update" or "delete")
+        
+    Raises:
+        HTTPException: 404 if the todo does not exist, 403 otherwise
+    """
+    result = await db.execute(select(Todo.id).where(Todo.id == todo_id))
+    
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Todo not found"
+        )
+    
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail=f"Not authorized to {action} this todo"
+    )
+
+
+async def _classify_missing(
+    db: AsyncSession,
+    todo_ids: Iterable[int],
+    action: str
+) -> dict:
+    """
+    Explain why todos were not affected by an owner-scoped batch statement
+    
+    Args:
+        db: Database session
+        todo_ids: IDs the statement did not touch
+        action: Verb for the error message ("update" or "delete")
+        
+    Returns:
+        Dictionary mapping todo id to a failed TodoBatchItemResult
+    """
+    todo_ids = set(todo_ids)
+    if not todo_ids:
+        return {}
+    
+    result = await db.execute(
+        select(Todo.id).where(Todo.id.in_(todo_ids))
+    )
+    existing = set(result.scalars())
+    
+    return {
+        todo_id: (
+            TodoBatchItemResult(
+                id=todo_id,
+                status=status.HTTP_403_FORBIDDEN,
+                detail=f"Not authorized to {action} this todo"
+            )
+            if todo_id in existing else
+            TodoBatchItemResult(
+                id=todo_id,
+                status=status.HTTP_404_NOT_FOUND,
+                detail="Todo not found"
+            )
+        )
+        for todo_id in todo_ids
+    }
+
+
+@router.post("/batch", response_model=TodoBatchResponse, status_code=status.HTTP_201_CREATED)
+async def create_todos_batch(
+    batch: TodoBatchCreate,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Create many todo items in a single transaction
+    
+    - **items**: List of todos, each with title, description and priority
+    
+    Results are returned in request order.
+    
+    Requires authentication
+    """
+    rows = [
+        {
+            "title": item.title,
+            "description": item.description,
+            "priority": item.priority,
+            "owner_id": current_user.id,
+            "is_completed": False
+        }
+        for item in batch.items
+    ]
+    
+    result = await db.scalars(
+        insert(Todo).returning(Todo, sort_by_parameter_order=True),
+        rows
+    )
+    new_todos = result.all()
+    
+    by_priority = {}
+    for item in batch.items:
+        by_priority[item.priority] = by_priority.get(item.priority, 0) + 1
+    await adjust_todo_counters(
+        db, current_user.id, total=len(new_todos), by_priority=by_priority
+    )
+    await db.commit()
+    
+    logger.info(f"Batch created {len(new_todos)} todos by user {current_user.username}")
+    
+    return {
+        "results": [
+            TodoBatchItemResult(
+                id=todo.id,
+                status=status.HTTP_201_CREATED,
+                todo=TodoResponse.model_validate(todo)
+            )
+            for todo in new_todos
+        ]
+    }
+
+
+@router.patch("/batch", response_model=TodoBatchResponse)
+async def update_todos_batch(
+    batch: TodoBatchUpdate,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Apply the same changes to many todo items in a single transaction
+    
+    - **ids**: IDs of the todos to update
+    - **changes**: Fields to set, as for a single update (e.g. is_completed)
+    
+    Each id gets its own result: 200 with the updated todo, or 404/403.
+    
+    Requires authentication and ownership
+    """
+    changes = _todo_changes(batch.changes)
+    owned = Todo.id.in_(batch.ids) & (Todo.owner_id == current_user.id)
+    
+    # Counter deltas need the previous state of the owned rows
+    previous = []
+    if "is_completed" in changes or "priority" in changes:
+        await lock_todo_counters(db, current_user.id)
+        result = await db.execute(
+            select(Todo.is_completed, Todo.priority)
+            .where(owned)
+            .with_for_update()
+        )
+        previous = result.all()
+    
+    values = _todo_update_values(changes)
+    if values:
+        statement = update(Todo).where(owned).values(**values).returning(Todo)
+    else:
+        statement = select(Todo).where(owned)
+    
+    result = await db.scalars(
+        statement.execution_options(populate_existing=True)
+    )
+    updated = {todo.id: todo for todo in result.all()}
+    
+    completed_delta = 0
+    by_priority = {}
+    for was_completed, old_priority in previous:
+        is_completed = changes.get("is_completed", was_completed)
+        completed_delta += int(is_completed) - int(was_completed)
+        new_priority = changes.get("priority", old_priority)
+        if new_priority != old_priority:
+            by_priority[old_priority] = by_priority.get(old_priority, 0) - 1
+            by_priority[new_priority] = by_priority.get(new_priority, 0) + 1
+    await adjust_todo_counters(
+        db, current_user.id, completed=completed_delta, by_priority=by_priority
+    )
+    
+    failures = await _classify_missing(
+        db, set(batch.ids) - set(updated), "update"
+    )
+    await db.commit()
+    
+    logger.info(f"Batch updated {len(updated)} todos by user {current_user.username}")
+    
+    return {
+        "results": [
+            TodoBatchItemResult(
+                id=todo_id,
+                status=status.HTTP_200_OK,
+                todo=TodoResponse.model_validate(updated[todo_id])
+            )
+            if todo_id in updated else failures[todo_id]
+            for todo_id in batch.ids
+        ]
+    }
+
+
+@router.delete("/batch", response_model=TodoBatchResponse)
+async def delete_todos_batch(
+    batch: TodoBatchDelete,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Delete many todo items in a single transaction
+    
+    - **ids**: IDs of the todos to delete
+    
+    Each id gets its own result: 200 if deleted, or 404/403.
+    
+    Requires authentication and ownership
+    """
+    result = await db.execute(
+        delete(Todo)
+        .where(Todo.id.in_(batch.ids), Todo.owner_id == current_user.id)
+        .returning(Todo.id, Todo.is_completed, Todo.priority)
+    )
+    deleted = result.all()
+    
+    by_priority = {}
+    for _, _, priority in deleted:
+        by_priority[priority] = by_priority.get(priority, 0) - 1
+    await adjust_todo_counters(
+        db, current_user.id,
+        total=-len(deleted),
+        completed=-sum(1 for _, is_completed, _ in deleted if is_completed),
+        by_priority=by_priority
+    )
+    
+    deleted_ids = {todo_id for todo_id, _, _ in deleted}
+    failures = await _classify_missing(
+        db, set(batch.ids) - deleted_ids, "delete"
+    )
+    await db.commit()
+    
+    logger.info(f"Batch deleted {len(deleted_ids)} todos by user {current_user.username}")
+    
+    return {
+        "results": [
+            TodoBatchItemResult(id=todo_id, status=status.HTTP_200_OK)
+            if todo_id in deleted_ids else failures[todo_id]
+            for todo_id in batch.ids
+        ]
+    }
+
+
 @router.get("/", response_model=List[TodoResponse])
 async def get_todos(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of items to skip"),
     limit: int = Query(10, ge=1, le=100, description="Number of items to return"),
+    cursor: str | None = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
     completed: bool | None = Query(None, description="Filter by completion status"),
     priority: str | None = Query(None, description="Filter by priority (low, medium, high)"),
     current_user: User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get all todos for the current user with pagination and filters
     
-    - **skip**: Number of items to skip (pagination)
+    - **skip**: Number of items to skip (offset pagination, ignored with cursor)
     - **limit**: Maximum number of items to return (1-100)
+    - **cursor**: Opaque cursor for keyset pagination (optional)
     - **completed**: Filter by completion status (optional)
     - **priority**: Filter by priority level (optional)
     
+    When more items may follow, the cursor for the next page is returned
+    in the X-Next-Cursor response header. Send the returned ETag back in
+    If-None-Match to get 304 Not Modified while nothing has changed.
+    
     Requires authentication
     """
-    # Build query
-    query = select(Todo).where(Todo.owner_id == current_user.id)
+    # Answer conditional requests without running the list query
+    version = await get_data_version(db, current_user.id)
+    etag = make_etag("todos", current_user.id, version, request.url.query)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    
+    # Build query over just the response columns
+    query = todo_list_query().where(Todo.owner_id == current_user.id)
     
     # Apply filters
     if completed is not None:
@@ -81,28 +396,142 @@ async def get_todos(
         query = query.where(Todo.priority == priority)
     
     # Apply ordering and pagination
-    query = query.order_by(Todo.created_at.desc()).offset(skip).limit(limit)
+    query = apply_pagination(query, cursor, skip, limit)
     
     # Execute query
     result = await db.execute(query)
-    todos = result.scalars().all()
+    todos = result.all()
+    
+    set_next_cursor(response, todos, limit)
+    set_etag(response, etag)
+    
+    return json_list_response(todo_list_adapter, row_dicts(todos), response)
+
+
+@router.get("/export")
+async def export_todos(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Export format (ndjson, csv)"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Export all of the current user's todos
+    
+    - **format**: ndjson (one JSON object per line) or csv
+    
+    Rows are streamed oldest first, so exports of any size use constant memory.
+    
+    Requires authentication
+    """
+    query = export_query().where(Todo.owner_id == current_user.id)
+    
+    logger.info(f"Todo export ({format}) started by user {current_user.username}")
+    
+    return export_response(query, format, "todos")
+
+
+@router.get("/search", response_model=List[TodoResponse])
+async def search_todos(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Words to search for"),
+    skip: int = Query(0, ge=0, description="Number of items to skip"),
+    limit: int = Query(10, ge=1, le=100, description="Number of items to return"),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Search the current user's todos by title and description
+    
+    - **q**: Words to search for; todos must contain all of them
+    - **skip**: Number of items to skip
+    - **limit**: Maximum number of items to return (1-100)
+    
+    Results are ranked by relevance, with title matches ranked above
+    description matches.
+    
+    Requires authentication
+    """
+    version = await get_data_version(db, current_user.id)
+    etag = make_etag("search", current_user.id, version, request.url.query)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    
+    query = search_query(db.get_bind().dialect.name, current_user.id, q)
+    
+    todos = []
+    if query is not None:
+        result = await db.execute(query.offset(skip).limit(limit))
+        todos = result.scalars().all()
+    
+    set_etag(response, etag)
     
     return todos
 
 
+@router.post("/import", response_model=TodoImportReport)
+async def import_todos_endpoint(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Import format (ndjson, csv)"),
+    progress: bool = Query(False, description="Stream NDJSON progress records as chunks commit"),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Import todos from an NDJSON or CSV request body
+    
+    - **format**: ndjson (one JSON object per line) or csv (header row of
+      title, description, priority followed by one todo per line)
+    - **progress**: respond with application/x-ndjson instead: a
+      {"type": "progress"} record with the running counts as each chunk
+      commits, then a {"type": "report"} record with the full report (or
+      {"type": "error"} if the import failed part way)
+    
+    The body is read as it streams in and committed in chunks, so imports of
+    any size use constant memory. Invalid lines are skipped and reported;
+    chunks committed before an error are kept.
+    
+    Requires authentication
+    """
+    logger.info(f"Todo import ({format}) started by user {current_user.username}")
+    
+    if progress:
+        return import_progress_response(current_user, iter_lines(request.stream()), format)
+    
+    report = await import_todos(db, current_user, iter_lines(request.stream()), format)
+    
+    logger.info(
+        f"Todo import finished for user {current_user.username}: "
+        f"{report['imported']} imported, {report['failed']} failed in {report['chunks']} chunks"
+    )
+    
+    return report
+
+
 @router.get("/{todo_id}", response_model=TodoResponse)
 async def get_todo(
     todo_id: int,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get a specific todo by ID
     
     - **todo_id**: ID of the todo to retrieve
     
+    The returned ETag can be sent in If-None-Match, or in If-Match to make
+    an update or delete conditional.
+    
     Requires authentication and ownership
     """
+    version = await get_data_version(db, current_user.id)
+    etag = make_etag("todo", current_user.id, version, todo_id)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    
     # Get todo
     result = await db.execute(
         select(Todo).where(Todo.id == todo_id)
@@ -122,6 +551,8 @@ async def get_todo(
             detail="Not authorized to access this todo"
         )
     
+    set_etag(response, etag)
+    
     return todo
 
 
@@ -129,6 +560,8 @@ async def get_todo(
 async def update_todo(
     todo_id: int,
     todo_data: TodoUpdate,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -141,42 +574,61 @@ async def update_todo(
     - **priority**: New priority (optional)
     - **is_completed**: Completion status (optional)
     
+    Send If-Match with the todo's ETag to fail with 412 if the user's
+    todos changed since it was read.
+    
     Requires authentication and ownership
     """
-    # Get todo
-    result = await db.execute(
-        select(Todo).where(Todo.id == todo_id)
-    )
-    todo = result.scalar_one_or_none()
-    
-    if not todo:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Todo not found"
+    changes = _todo_changes(todo_data)
+    owned = (Todo.id == todo_id) & (Todo.owner_id == current_user.id)
+    
+    async def apply_update(db: AsyncSession):
+        # Counter deltas need the previous state when counted fields change
+        previous = None
+        if "is_completed" in changes or "priority" in changes:
+            await lock_todo_counters(db, current_user.id)
+            result = await db.execute(
+                select(Todo.is_completed, Todo.priority)
+                .where(owned)
+                .with_for_update()
+            )
+            previous = result.one_or_none()
+            if previous is None:
+                await _raise_missing(db, todo_id, "update")
+        
+        # Update and fetch the row in one statement, scoped to the owner
+        values = _todo_update_values(changes)
+        if values:
+            statement = update(Todo).where(owned).values(**values).returning(Todo)
+        else:
+            statement = select(Todo).where(owned)
+        
+        result = await db.scalars(
+            statement.execution_options(populate_existing=True)
         )
-    
-    # Check ownership
-    if todo.owner_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to update this todo"
+        todo = result.one_or_none()
+        
+        if todo is None:
+            await _raise_missing(db, todo_id, "update")
+        
+        await check_if_match(request, db, current_user.id, todo_id)
+        
+        completed_delta = 0
+        by_priority = {}
+        if previous is not None:
+            was_completed, old_priority = previous
+            completed_delta = int(todo.is_completed) - int(was_completed)
+            if todo.priority != old_priority:
+                by_priority = {old_priority: -1, todo.priority: 1}
+        version = await adjust_todo_counters(
+            db, current_user.id, completed=completed_delta, by_priority=by_priority
         )
+        return todo, version
     
-    # Update fields
-    update_data = todo_data.model_dump(exclude_unset=True)
+    todo, version = await run_write(db, apply_update)
     
-    for field, value in update_data.items():
-        setattr(todo, field, value)
-    
-    # Update completed_at timestamp if marking as completed
-    if todo_data.is_completed is not None:
-        if todo_data.is_completed and not todo.is_completed:
-            todo.completed_at = datetime.utcnow()
-        elif not todo_data.is_completed and todo.is_completed:
-            todo.completed_at = None
-    
-    await db.commit()
-    await db.refresh(todo)
+    if version is not None:
+        set_etag(response, make_etag("todo", current_user.id, version, todo.id))
     
     logger.info(f"Todo updated: {todo.id} by user {current_user.username}")
     
@@ -186,6 +638,7 @@ async def update_todo(
 @router.patch("/{todo_id}/complete", response_model=TodoResponse)
 async def toggle_todo_completion(
     todo_id: int,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -196,35 +649,35 @@ async def toggle_todo_completion(
     
     Requires authentication and ownership
     """
-    # Get todo
-    result = await db.execute(
-        select(Todo).where(Todo.id == todo_id)
-    )
-    todo = result.scalar_one_or_none()
-    
-    if not todo:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Todo not found"
+    async def toggle(db: AsyncSession):
+        # Toggle atomically in the database, scoped to the owner
+        result = await db.scalars(
+            update(Todo)
+            .where(Todo.id == todo_id, Todo.owner_id == current_user.id)
+            .values(
+                is_completed=~Todo.is_completed,
+                completed_at=case(
+                    (Todo.is_completed == False, datetime.utcnow()),
+                    else_=None
+                )
+            )
+            .returning(Todo)
+            .execution_options(populate_existing=True)
         )
-    
-    # Check ownership
-    if todo.owner_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to update this todo"
+        todo = result.one_or_none()
+        
+        if todo is None:
+            await _raise_missing(db, todo_id, "update")
+        
+        version = await adjust_todo_counters(
+            db, current_user.id, completed=1 if todo.is_completed else -1
         )
+        return todo, version
     
-    # Toggle completion
-    todo.is_completed = not todo.is_completed
-    
-    if todo.is_completed:
-        todo.completed_at = datetime.utcnow()
-    else:
-        todo.completed_at = None
-    
-    await db.commit()
-    await db.refresh(todo)
+    todo, version = await run_write(db, toggle)
+
+    if version is not None:
+        set_etag(response, make_etag("todo", current_user.id, version, todo.id))
     
     logger.info(
         f"Todo completion toggled: {todo.id} "
@@ -237,6 +690,7 @@ async def toggle_todo_completion(
 @router.delete("/{todo_id}", response_model=MessageResponse)
 async def delete_todo(
     todo_id: int,
+    request: Request,
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -245,31 +699,35 @@ async def delete_todo(
     
     - **todo_id**: ID of the todo to delete
     
+    Send If-Match with the todo's ETag to fail with 412 if the user's
+    todos changed since it was read.
+    
     Requires authentication and ownership
     """
-    # Get todo
-    result = await db.execute(
-        select(Todo).where(Todo.id == todo_id)
-    )
-    todo = result.scalar_one_or_none()
-    
-    if not todo:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Todo not found"
+    async def remove(db: AsyncSession):
+        # Delete in one statement, scoped to the owner
+        result = await db.execute(
+            delete(Todo)
+            .where(Todo.id == todo_id, Todo.owner_id == current_user.id)
+            .returning(Todo.is_completed, Todo.priority)
         )
-    
-    # Check ownership
-    if todo.owner_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to delete this todo"
+        deleted = result.one_or_none()
+        
+        if deleted is None:
+            await _raise_missing(db, todo_id, "delete")
+        
+        await check_if_match(request, db, current_user.id, todo_id)
+        
+        is_completed, priority = deleted
+        await adjust_todo_counters(
+            db, current_user.id,
+            total=-1,
+            completed=-1 if is_completed else 0,
+            by_priority={priority: -1}
         )
     
-    # Delete todo
-    await db.delete(todo)
-    await db.commit()
-    
+    await run_write(db, remove)
+
     logger.info(f"Todo deleted: {todo_id} by user {current_user.username}")
     
     return {"message": "Todo successfully deleted"}
@@ -277,45 +735,34 @@ async def delete_todo(
 
 @router.get("/stats/summary")
 async def get_todo_stats(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get statistics about user's todos
     
-    Returns counts of total, completed, and pending todos
+    Returns counts of total, completed, and pending todos. Supports
+    If-None-Match with the returned ETag.
     
     Requires authentication
     """
-    # Get total count
-    total_result = await db.execute(
-        select(func.count(Todo.id)).where(Todo.owner_id == current_user.id)
-    )
-    total = total_result.scalar()
+    counters = await get_todo_counters(db, current_user.id)
     
-    # Get completed count
-    completed_result = await db.execute(
-        select(func.count(Todo.id)).where(
-            Todo.owner_id == current_user.id,
-            Todo.is_completed == True
-        )
-    )
-    completed = completed_result.scalar()
-    
-    # Get pending count
-    pending = total - completed
-    
-    # Get counts by priority
-    priority_result = await db.execute(
-        select(Todo.priority, func.count(Todo.id))
-        .where(Todo.owner_id == current_user.id)
-        .group_by(Todo.priority)
-    )
-    priority_counts = {priority: count for priority, count in priority_result.all()}
+    etag = make_etag("stats", current_user.id, counters.version)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    set_etag(response, etag)
     
     return {
-        "total": total,
-        "completed": completed,
-        "pending": pending,
-        "by_priority": priority_counts
+        "total": counters.total,
+        "completed": counters.completed,
+        "pending": counters.total - counters.completed,
+        "by_priority": {
+            priority: count
+            for priority, count in counters.by_priority().items()
+            if count
+        }
     }
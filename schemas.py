@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field, ConfigDict
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from models import UserRole, TodoPriority
 
@@ -81,6 +81,57 @@ class TodoWithOwner(TodoResponse):
     model_config = ConfigDict(from_attributes=True)
 
 
+# ============= Batch Schemas =============
+
+# Maximum number of items accepted by a single batch request
+MAX_BATCH_SIZE = 500
+
+
+class TodoBatchCreate(BaseModel):
+    """Schema for creating many todos at once"""
+    items: List[TodoCreate] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+class TodoBatchUpdate(BaseModel):
+    """Schema for applying the same changes to many todos"""
+    ids: List[int] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+    changes: TodoUpdate
+
+
+class TodoBatchDelete(BaseModel):
+    """Schema for deleting many todos"""
+    ids: List[int] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+class TodoBatchItemResult(BaseModel):
+    """Outcome of a single item in a batch request"""
+    id: Optional[int] = None
+    status: int
+    detail: Optional[str] = None
+    todo: Optional[TodoResponse] = None
+
+
+class TodoBatchResponse(BaseModel):
+    """Per-item results of a batch request, in request order"""
+    results: List[TodoBatchItemResult]
+
+
+class TodoImportLineError(BaseModel):
+    """Validation errors for one rejected import line"""
+    line: int
+    errors: List[str]
+
+
+class TodoImportReport(BaseModel):
+    """Summary of a bulk import"""
+    processed: int
+    imported: int
+    failed: int
+    chunks: int
+    errors: List[TodoImportLineError]
+    errors_truncated: bool
+
+
 # ============= Authentication Schemas =============
 
 class Token(BaseModel):
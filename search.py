@@ -0,0 +1,97 @@
+import re
+from typing import Optional
+from sqlalchemy import Select, select, func, or_, table, column
+from sqlalchemy.sql.expression import literal_column
+from models import Todo, todo_search_vector
+
+# SQLite FTS5 table maintained by database._create_search_index
+todos_fts = table("todos_fts", column("rowid"))
+
+# bm25 column weights for (title, description)
+SQLITE_RANK_WEIGHTS = (10.0, 1.0)
+
+_WORD = re.compile(r"\w", re.UNICODE)
+
+
+def fts5_query(q: str) -> Optional[str]:
+    """
+    Turn free text into an FTS5 query matching all of its terms
+
+    Every term is quoted as a phrase so FTS5 operators and syntax in user
+    input (AND, NEAR, *, column filters, stray quotes) are matched as text.
+
+    Args:
+        q: User search text
+
+    Returns:
+        FTS5 MATCH expression, or None if the text has no searchable terms
+    """
+    terms = [term for term in q.split() if _WORD.search(term)]
+    if not terms:
+        return None
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def like_pattern(q: str) -> str:
+    """
+    Build a LIKE pattern matching text containing q literally
+
+    The wildcards % and _ and the escape character itself are escaped with
+    a backslash, so the pattern must be used with escape="\\".
+
+    Args:
+        q: User search text
+
+    Returns:
+        Substring pattern
+    """
+    escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def search_query(dialect: str, owner_id: int, q: str) -> Optional[Select]:
+    """
+    Build a ranked full text search over one user's todos
+
+    SQLite matches against the todos_fts index and ranks by bm25; Postgres
+    matches the ix_todos_search GIN index and ranks by ts_rank. Other
+    databases fall back to an unranked substring scan. Titles weigh more
+    than descriptions in both rankings.
+
+    Args:
+        dialect: Database dialect name
+        owner_id: User whose todos are searched
+        q: User search text
+
+    Returns:
+        Select of Todo in rank order, or None if nothing can match
+    """
+    query = select(Todo).where(Todo.owner_id == owner_id)
+
+    if dialect == "sqlite":
+        match = fts5_query(q)
+        if match is None:
+            return None
+        fts = literal_column("todos_fts")
+        return (
+            query.join(todos_fts, todos_fts.c.rowid == Todo.id)
+            .where(fts.op("MATCH")(match))
+            .order_by(func.bm25(fts, *SQLITE_RANK_WEIGHTS), Todo.id)
+        )
+
+    if dialect == "postgresql":
+        # websearch_to_tsquery accepts arbitrary user input without errors
+        tsquery = func.websearch_to_tsquery(literal_column("'english'::regconfig"), q)
+        vector = todo_search_vector(Todo.title, Todo.description)
+        return (
+            query.where(vector.op("@@")(tsquery))
+            .order_by(func.ts_rank(vector, tsquery).desc(), Todo.id)
+        )
+
+    pattern = like_pattern(q)
+    return query.where(
+        or_(
+            Todo.title.ilike(pattern, escape="\\"),
+            Todo.description.ilike(pattern, escape="\\")
+        )
+    ).order_by(Todo.created_at.desc(), Todo.id.desc())
@@ -0,0 +1,88 @@
+from typing import Any, Dict, Iterable, List, Sequence
+from fastapi import Response
+from pydantic import TypeAdapter
+from sqlalchemy import Row, Select, select
+from models import Todo, User
+from schemas import TodoResponse, TodoWithOwner, UserResponse
+
+# Columns backing each field of a todo / user response, in schema order
+TODO_RESPONSE_COLUMNS = [getattr(Todo, name) for name in TodoResponse.model_fields]
+OWNER_RESPONSE_COLUMNS = [
+    getattr(User, name).label(f"owner__{name}") for name in UserResponse.model_fields
+]
+
+todo_list_adapter = TypeAdapter(List[TodoResponse])
+todo_with_owner_list_adapter = TypeAdapter(List[TodoWithOwner])
+
+
+class PreEncodedJSONResponse(Response):
+    """JSON response whose body is passed in already encoded"""
+    media_type = "application/json"
+
+
+def todo_list_query() -> Select:
+    """Select the columns of a todo response"""
+    return select(*TODO_RESPONSE_COLUMNS)
+
+
+def todo_with_owner_list_query() -> Select:
+    """Select the columns of a todo response joined with its owner's"""
+    return select(*TODO_RESPONSE_COLUMNS, *OWNER_RESPONSE_COLUMNS).join(
+        User, Todo.owner_id == User.id
+    )
+
+
+def row_dicts(rows: Sequence[Row]) -> List[dict]:
+    """
+    Convert result rows to dicts keyed by column name
+
+    Pydantic reads plain dicts several times faster than it looks up the
+    same values as attributes of a row.
+    """
+    if not rows:
+        return []
+    keys = rows[0]._fields
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def with_owner(rows: Sequence[Row]) -> List[dict]:
+    """
+    Convert todo_with_owner_list_query rows to dicts with a nested "owner"
+
+    Each distinct owner is validated once and shared by all of their todos.
+    """
+    owner_names = list(UserResponse.model_fields)
+    owners: Dict[int, UserResponse] = {}
+    items = row_dicts(rows)
+    for item in items:
+        values = {name: item.pop(f"owner__{name}") for name in owner_names}
+        owner = owners.get(values["id"])
+        if owner is None:
+            owner = owners[values["id"]] = UserResponse.model_validate(values)
+        item["owner"] = owner
+    return items
+
+
+def json_list_response(adapter: TypeAdapter, items: Iterable[Any], response: Response) -> Response:
+    """
+    Validate and encode a list response in one go
+
+    FastAPI validates the returned objects against the response model,
+    converts them to JSON compatible Python values and encodes those with
+    the json module. Here the adapter does all of it in compiled code and
+    the encoded bytes are sent as they are. The output is the same, byte
+    for byte.
+
+    Args:
+        adapter: TypeAdapter of the list response model
+        items: Dicts to validate, as built by row_dicts or with_owner
+        response: Response injected into the endpoint; its headers are kept
+
+    Returns:
+        Response with the encoded body
+    """
+    body = adapter.dump_json(adapter.validate_python(items))
+    encoded = PreEncodedJSONResponse(body)
+    # FastAPI does not merge the injected response into one returned directly
+    encoded.raw_headers.extend(response.headers.raw)
+    return encoded
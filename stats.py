@@ -0,0 +1,152 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Optional
+from sqlalchemy import select, func, case, true
+from database import ReadSessionLocal
+from models import User, Todo, UserRole
+from config import get_settings
+import logging
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def _count_where(condition):
+    """Aggregate counting the rows matching a condition"""
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+async def compute_system_stats() -> dict:
+    """
+    Compute system-wide statistics in a single statement
+
+    Each table is scanned once; all counts come back in one row.
+
+    Returns:
+        Dictionary of user and todo statistics
+    """
+    user_counts = select(
+        func.count(User.id).label("total"),
+        _count_where(User.is_active == True).label("active"),
+        _count_where(User.is_verified == True).label("verified"),
+        *(
+            _count_where(User.role == role).label(f"role_{role.value}")
+            for role in UserRole
+        )
+    ).subquery()
+
+    todo_counts = select(
+        func.count(Todo.id).label("todos_total"),
+        _count_where(Todo.is_completed == True).label("todos_completed")
+    ).subquery()
+
+    async with ReadSessionLocal() as db:
+        # Both subqueries return exactly one row, so the join is 1 x 1
+        row = (await db.execute(
+            select(user_counts, todo_counts)
+            .select_from(user_counts.join(todo_counts, true()))
+        )).one()
+
+    # Look values up by label: the compiled statement is cached, so column
+    # objects from this call's subqueries would not match its result map
+    values = row._mapping
+    users_by_role = {
+        role.value: values[f"role_{role.value}"]
+        for role in UserRole
+        if values[f"role_{role.value}"]
+    }
+    total_todos = values["todos_total"]
+    completed_todos = values["todos_completed"]
+
+    return {
+        "users": {
+            "total": values["total"],
+            "active": values["active"],
+            "verified": values["verified"],
+            "by_role": users_by_role
+        },
+        "todos": {
+            "total": total_todos,
+            "completed": completed_todos,
+            "pending": total_todos - completed_todos
+        },
+        "generated_at": datetime.now(timezone.utc)
+    }
+
+
+class SnapshotCache:
+    """
+    In-memory snapshot served with stale-while-revalidate semantics
+
+    The first read waits for the loader. Afterwards reads always return the
+    current snapshot immediately, kicking off a single background refresh
+    once it is older than ``max_age`` seconds. A ``max_age`` of zero
+    disables caching.
+    """
+
+    def __init__(self, loader: Callable[[], Awaitable[dict]], max_age: float):
+        self.loader = loader
+        self.max_age = max_age
+        self._snapshot: Optional[dict] = None
+        self._loaded_at = 0.0
+        self._refreshing: Optional[asyncio.Task] = None
+
+    async def get(self) -> dict:
+        """
+        Get the current snapshot
+
+        Returns:
+            Snapshot produced by the loader
+        """
+        if self._snapshot is None or self.max_age <= 0:
+            return await self.refresh()
+
+        if time.monotonic() - self._loaded_at > self.max_age:
+            self._start_refresh()
+
+        return self._snapshot
+
+    async def refresh(self) -> dict:
+        """
+        Reload the snapshot, joining a refresh already in flight
+
+        Returns:
+            Fresh snapshot
+        """
+        # Shield so a cancelled reader does not cancel the shared refresh
+        return await asyncio.shield(self._start_refresh())
+
+    def _start_refresh(self) -> asyncio.Task:
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.create_task(self._load())
+        return self._refreshing
+
+    async def _load(self) -> dict:
+        try:
+            snapshot = await self.loader()
+        except Exception as e:
+            logger.error(f"Error refreshing snapshot: {e}")
+            if self._snapshot is None:
+                raise
+            return self._snapshot
+
+        self._snapshot = snapshot
+        self._loaded_at = time.monotonic()
+        return snapshot
+
+    async def run_refresher(self) -> None:
+        """Refresh the snapshot every ``max_age`` seconds until cancelled"""
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                pass  # Already logged; keep serving the previous snapshot
+            await asyncio.sleep(self.max_age)
+
+
+# System overview for /admin/stats/overview
+system_stats = SnapshotCache(
+    compute_system_stats,
+    max_age=settings.ADMIN_STATS_REFRESH_SECONDS
+)
@@ -0,0 +1,74 @@
+"""
+Shared fixtures for the API tests
+
+The application reads its settings when first imported, so the scratch
+database is configured here before anything imports it.
+"""
+import itertools
+import os
+import sys
+import tempfile
+
+import httpx
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_data_dir = tempfile.TemporaryDirectory(prefix="todo-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_data_dir.name}/todo.db"
+os.environ["RATE_LIMIT_SQLITE_PATH"] = f"{_data_dir.name}/ratelimit.db"
+os.environ.setdefault("DEBUG", "false")
+os.environ.setdefault("ADMIN_STATS_REFRESH_SECONDS", "0")
+
+from database import engines  # noqa: E402
+from main import app  # noqa: E402
+
+# Every client gets its own address, so IP rate limits do not carry over
+_client_hosts = (f"10.0.{n // 250}.{n % 250 + 1}" for n in itertools.count())
+_usernames = (f"user{n}" for n in itertools.count(1))
+
+
+def pytest_sessionfinish(session, exitstatus):
+    _data_dir.cleanup()
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+async def started_app():
+    """The application, started once for the session since shutdown is final"""
+    async with app.router.lifespan_context(app):
+        yield app
+    for engine in engines:
+        await engine.dispose()
+
+
+@pytest.fixture
+async def client(started_app):
+    """Client for the started application, from a fresh client address"""
+    transport = httpx.ASGITransport(app=started_app, client=(next(_client_hosts), 50000))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        yield http
+
+
+async def register_and_login(client: httpx.AsyncClient, username: str = None) -> dict:
+    """
+    Register a new user and log in as them
+
+    Returns:
+        Authorization headers for the user
+    """
+    username = username or next(_usernames)
+    response = await client.post("/auth/register", json={
+        "email": f"{username}@example.com",
+        "username": username,
+        "password": "password1"
+    })
+    assert response.status_code == 201, response.text
+    response = await client.post("/auth/login", data={"username": username, "password": "password1"})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
@@ -0,0 +1,72 @@
+import csv
+import io
+import json
+
+import pytest
+from sqlalchemy import func, select
+
+from conftest import register_and_login
+from database import AsyncSessionLocal
+from export import _stream_rows, export_query
+from config import get_settings
+from models import Todo
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def small_pages(monkeypatch):
+    monkeypatch.setattr(get_settings(), "EXPORT_BATCH_SIZE", 7)
+
+
+async def create_todos(client, headers, count):
+    for n in range(count):
+        response = await client.post("/todos/", json={"title": f"todo {n}"}, headers=headers)
+        assert response.status_code == 201, response.text
+    return response.json()["owner_id"]
+
+
+async def test_export_pages_cover_every_todo(client, small_pages):
+    headers = await register_and_login(client)
+    owner_id = await create_todos(client, headers, 30)
+
+    async with AsyncSessionLocal() as db:
+        expected = (await db.scalars(
+            select(Todo.id).where(Todo.owner_id == owner_id).order_by(Todo.created_at, Todo.id)
+        )).all()
+
+    response = await client.get("/todos/export", params={"format": "ndjson"}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert [json.loads(line)["id"] for line in response.text.splitlines()] == expected
+
+    response = await client.get("/todos/export", params={"format": "csv"}, headers=headers)
+    assert response.status_code == 200, response.text
+    records = list(csv.DictReader(io.StringIO(response.text)))
+    assert [int(record["id"]) for record in records] == expected
+    assert records[0]["title"] == "todo 0"
+
+
+async def test_writes_succeed_during_export(client, small_pages):
+    headers = await register_and_login(client)
+    owner_id = await create_todos(client, headers, 20)
+
+    async with AsyncSessionLocal() as db:
+        existing = set((await db.scalars(select(Todo.id).where(Todo.owner_id == owner_id))).all())
+
+    query = export_query().where(Todo.owner_id == owner_id)
+    exported = []
+    writes = 0
+    async for chunk in _stream_rows(query, "ndjson"):
+        exported.extend(json.loads(line)["id"] for line in chunk.decode().splitlines())
+
+        # The client is still downloading: writers must not be locked out
+        async with AsyncSessionLocal() as db:
+            db.add(Todo(title="written during export", owner_id=owner_id))
+            await db.commit()
+        writes += 1
+
+    assert len(exported) == len(set(exported))
+    assert existing <= set(exported)
+    async with AsyncSessionLocal() as db:
+        total = await db.scalar(select(func.count(Todo.id)).where(Todo.owner_id == owner_id))
+    assert total == len(existing) + writes
@@ -0,0 +1,29 @@
+import httpx
+import pytest
+
+from config import get_settings
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_metrics_refused_to_remote_clients(client):
+    response = await client.get("/metrics")
+    assert response.status_code == 403
+
+
+async def test_metrics_served_to_loopback(started_app):
+    transport = httpx.ASGITransport(app=started_app, client=("127.0.0.1", 50000))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as local:
+        response = await local.get("/metrics")
+    assert response.status_code == 200
+    assert "startup_phase_seconds" in response.text
+
+
+async def test_metrics_token(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "METRICS_TOKEN", "scrape-token")
+
+    response = await client.get("/metrics", headers={"Authorization": "Bearer wrong"})
+    assert response.status_code == 403
+
+    response = await client.get("/metrics", headers={"Authorization": "Bearer scrape-token"})
+    assert response.status_code == 200
@@ -0,0 +1,80 @@
+import pytest
+
+from conftest import register_and_login
+from ratelimit import MemoryBucketStore, RateLimiter, SQLiteBucketStore
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_spa_session_is_not_rate_limited(client):
+    headers = await register_and_login(client)
+
+    # The SPA refetches the list and stats after every mutation
+    async def refetch():
+        for path in ("/todos/", "/todos/stats/summary"):
+            response = await client.get(path, headers=headers)
+            assert response.status_code == 200, response.text
+
+    todo_ids = []
+    for n in range(40):
+        response = await client.post("/todos/", json={"title": f"todo {n}"}, headers=headers)
+        assert response.status_code == 201, response.text
+        todo_ids.append(response.json()["id"])
+        await refetch()
+    for todo_id in todo_ids:
+        response = await client.patch(f"/todos/{todo_id}/complete", headers=headers)
+        assert response.status_code == 200, response.text
+        await refetch()
+    for todo_id in todo_ids[:20]:
+        response = await client.delete(f"/todos/{todo_id}", headers=headers)
+        assert response.status_code == 200, response.text
+        await refetch()
+
+
+async def test_logins_from_one_address(client):
+    headers = await register_and_login(client, "office")
+    assert headers
+
+    # Colleagues behind one NAT logging in within the same minute
+    for _ in range(20):
+        response = await client.post("/auth/login", data={"username": "office", "password": "password1"})
+        assert response.status_code == 200, response.text
+
+
+async def test_root_keeps_strict_limit(client):
+    for _ in range(60):
+        response = await client.get("/")
+        assert response.status_code == 200
+
+    response = await client.get("/")
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+    # Other routes still have global budget left
+    response = await client.get("/health")
+    assert response.status_code == 200
+
+
+async def test_limiters_share_a_store_by_name():
+    store = MemoryBucketStore(capacity=2, rate=1 / 60)
+    strict = RateLimiter("route", store, {"GET /": 1}, default_cost=0)
+    budget = RateLimiter("global", store, {"GET /health": 0})
+
+    assert strict.cost("GET", "/todos/") == 0
+    assert budget.cost("GET", "/health") == 0
+    assert budget.cost("GET", "/todos/") == 1
+
+    assert await strict.take("ip:a", 2) == 0
+    assert await strict.take("ip:a", 1) > 0
+    assert await budget.take("ip:a", 1) == 0
+
+
+async def test_sqlite_store(tmp_path):
+    store = SQLiteBucketStore(str(tmp_path / "buckets.db"), capacity=3, rate=1 / 60)
+    other_worker = SQLiteBucketStore(str(tmp_path / "buckets.db"), capacity=3, rate=1 / 60)
+
+    assert await store.take("ip:a", 2) == 0
+    assert await other_worker.take("ip:a", 1) == 0
+    retry_after = await store.take("ip:a", 1)
+    assert 0 < retry_after <= 60
+    assert await other_worker.take("ip:b", 3) == 0
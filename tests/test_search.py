@@ -0,0 +1,32 @@
+import pytest
+
+from conftest import register_and_login
+from database import AsyncSessionLocal
+from search import like_pattern, search_query
+
+pytestmark = pytest.mark.anyio
+
+
+def test_like_pattern_escapes_wildcards():
+    assert like_pattern("100%") == "%100\\%%"
+    assert like_pattern("a_b") == "%a\\_b%"
+    assert like_pattern("c:\\tmp") == "%c:\\\\tmp%"
+
+
+@pytest.mark.parametrize("q, expected", [
+    ("100%", {"100% done"}),
+    ("a_b", {"a_b"}),
+    ("c:\\tmp", {"c:\\tmp"}),
+    ("DONE", {"100% done", "1000 done"}),
+])
+async def test_substring_fallback_matches_literally(client, q, expected):
+    headers = await register_and_login(client)
+    for title in ("100% done", "1000 done", "a_b", "axb", "c:\\tmp", "c:tmp"):
+        response = await client.post("/todos/", json={"title": title}, headers=headers)
+        assert response.status_code == 201, response.text
+    owner_id = response.json()["owner_id"]
+
+    # Databases without a full text index use the substring scan
+    async with AsyncSessionLocal() as db:
+        todos = (await db.scalars(search_query("mysql", owner_id, q))).all()
+    assert {todo.title for todo in todos} == expected
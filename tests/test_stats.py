@@ -0,0 +1,21 @@
+import pytest
+
+from conftest import register_and_login
+from stats import compute_system_stats
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_system_stats_recompute(client):
+    first = await compute_system_stats()
+
+    headers = await register_and_login(client)
+    response = await client.post("/todos/", json={"title": "counted"}, headers=headers)
+    assert response.status_code == 201, response.text
+
+    # The second run reuses the cached compiled statement
+    second = await compute_system_stats()
+    assert second["users"]["total"] == first["users"]["total"] + 1
+    assert second["users"]["by_role"]["user"] == first["users"]["by_role"].get("user", 0) + 1
+    assert second["todos"]["total"] == first["todos"]["total"] + 1
+    assert second["todos"]["pending"] == first["todos"]["pending"] + 1
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from database import AsyncSessionLocal
+from models import Todo, User
+from write_queue import WriteQueue
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_failed_operation_rolls_back_alone(started_app):
+    async with AsyncSessionLocal() as db:
+        user = User(email="queue@example.com", username="queue", hashed_password="x")
+        db.add(user)
+        await db.commit()
+        owner_id = user.id
+
+    runs = []
+
+    def add(title, error=None):
+        async def operation(session):
+            runs.append(title)
+            session.add(Todo(title=title, owner_id=owner_id))
+            await session.flush()
+            if error is not None:
+                raise error
+            return title
+        return operation
+
+    queue = WriteQueue(max_batch=10, max_delay=0.05)
+    queue.start()
+    try:
+        results = await asyncio.gather(
+            queue.submit(add("first")),
+            queue.submit(add("missing", HTTPException(status_code=404))),
+            queue.submit(add("second")),
+            queue.submit(add("stale", HTTPException(status_code=412))),
+            queue.submit(add("third")),
+            return_exceptions=True
+        )
+    finally:
+        await queue.stop()
+
+    assert results[0::2] == ["first", "second", "third"]
+    assert [error.status_code for error in results[1::2]] == [404, 412]
+    # Failures are not replayed against the rest of the batch
+    assert runs == ["first", "missing", "second", "stale", "third"]
+
+    async with AsyncSessionLocal() as db:
+        titles = (await db.scalars(
+            select(Todo.title).where(Todo.owner_id == owner_id).order_by(Todo.id)
+        )).all()
+    assert titles == ["first", "second", "third"]
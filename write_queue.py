@@ -0,0 +1,215 @@
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Tuple, TypeVar
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import AsyncSessionLocal, note_write
+from metrics import registry, Gauge, Histogram
+from config import get_settings
+import logging
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+T = TypeVar("T")
+
+# A write operation applies its changes to the session it is given without
+# committing, and returns the result for its caller. It runs in a savepoint
+# that is rolled back if it raises, so it must not have effects outside the
+# database.
+Operation = Callable[[AsyncSession], Awaitable[T]]
+
+
+class WriteQueue:
+    """
+    Group commit for short write operations
+
+    A single writer task collects the operations queued while the previous
+    batch was committing, waits up to ``max_delay`` seconds for more, and
+    applies up to ``max_batch`` of them in one transaction, so the batch
+    pays for a single commit. Each operation runs in its own savepoint:
+    when one raises, only its savepoint is rolled back and its exception is
+    raised to its caller, while the rest of the batch carries on; if the
+    commit fails, every operation in the batch fails with it. Callers are
+    only resumed once their batch is committed.
+
+    Statements run in the writer task, so they are not counted in the
+    submitting request's query stats.
+    """
+
+    def __init__(self, max_batch: int, max_delay: float):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self) -> None:
+        """Start the writer task on the running event loop"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Commit the operations already queued and stop the writer task"""
+        if not self.running:
+            return
+        self._stopping = True
+        # Wake the writer if it is waiting for work
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+
+    async def submit(self, operation: Operation) -> T:
+        """
+        Queue an operation and wait until its batch is committed
+
+        Args:
+            operation: Async callable taking the batch session
+
+        Returns:
+            Result of the operation
+
+        Raises:
+            Exception: Whatever the operation raised, or the commit error
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((operation, future))
+        return await future
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            if batch:
+                try:
+                    await self._apply(batch)
+                except Exception as e:
+                    # Never let one bad batch stop the writer
+                    logger.error(f"Write queue batch failed: {e}", exc_info=True)
+            if self._stopping and self._queue.empty():
+                return
+
+    async def _collect(self) -> List[Tuple[Operation, asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = []
+        deadline = 0.0
+
+        while len(batch) < self.max_batch:
+            if not self._queue.empty():
+                item = self._queue.get_nowait()
+            elif self._stopping:
+                break
+            elif not batch:
+                item = await self._queue.get()
+            else:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+
+            if item is None:
+                continue
+            if not batch:
+                deadline = loop.time() + self.max_delay
+            batch.append(item)
+
+        return batch
+
+    async def _apply(self, batch: List[Tuple[Operation, asyncio.Future]]) -> None:
+        # Callers that went away before their turn are skipped
+        pending = [(operation, future) for operation, future in batch if not future.done()]
+        if not pending:
+            return
+
+        applied = []
+        try:
+            async with AsyncSessionLocal() as session:
+                connection = await session.connection()
+                if connection.dialect.name == "sqlite":
+                    # The driver only opens a transaction before DML, and a
+                    # savepoint outside one commits when it is released
+                    await connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+                for operation, future in pending:
+                    try:
+                        async with session.begin_nested():
+                            result = await operation(session)
+                    except Exception as e:
+                        # Only this operation's changes were rolled back
+                        if not future.done():
+                            future.set_exception(e)
+                        continue
+
+                    # Detach what the operation loaded, so later operations
+                    # in the batch cannot change objects already handed back
+                    session.expunge_all()
+                    applied.append((future, result))
+
+                await session.commit()
+        except Exception as e:
+            logger.error(f"Write queue commit of {len(pending)} operations failed: {e}")
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        if not applied:
+            return
+
+        write_queue_batch_size.observe(len(applied))
+        for future, result in applied:
+            if not future.done():
+                future.set_result(result)
+
+
+async def run_write(db: AsyncSession, operation: Operation) -> T:
+    """
+    Apply a write operation and commit it
+
+    While the write queue is running the operation is group committed by
+    the writer task in its own session; otherwise it runs on ``db`` and is
+    committed immediately.
+
+    Args:
+        db: Request database session
+        operation: Async callable taking the session to write with
+
+    Returns:
+        Result of the operation
+    """
+    if write_queue.running:
+        result = await write_queue.submit(operation)
+        # The batch committed in the writer task, outside this request
+        note_write()
+        return result
+
+    result = await operation(db)
+    await db.commit()
+    return result
+
+
+write_queue = WriteQueue(
+    max_batch=settings.WRITE_QUEUE_MAX_BATCH,
+    max_delay=settings.WRITE_QUEUE_MAX_DELAY_MS / 1000
+)
+
+write_queue_batch_size = registry.register(Histogram(
+    "write_queue_batch_size",
+    "Write operations committed together by the write queue",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+))
+registry.register(Gauge(
+    "write_queue_pending",
+    "Write operations waiting for the writer task",
+    function=lambda: {(): write_queue.pending()}
+))